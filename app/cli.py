@@ -0,0 +1,238 @@
+import os
+import sys
+import time
+import signal
+import logging
+import asyncio
+import argparse
+import multiprocessing
+from feeds.profiles import Profile, load_profiles
+from feeds.crawl import Crawl, print_summary, window_start
+from sinks import FIELDS, SINKS, ResultSink, flushing, open_sink
+from metrics import get_metrics
+from storage.runlog import RunLog
+from storage.textstore import TextStore
+from settings import METRICS_PATH, METRICS_SNAPSHOT_SECONDS, INCREMENTAL, WINDOW, RUN_BUDGET, FEED_BUDGET, TEXT_STORE
+
+'''
+    Headless entry point (no Tk window), for servers and cron
+
+        python cli.py -k "fire, flood" -f "evacuation"
+        python cli.py --keywords-file keywords.txt --feedwords-file feedwords.txt
+        python cli.py --profiles profiles.json            (one output file per profile)
+        python cli.py --profiles profiles.json --daemon --interval 900
+        python cli.py -k "fire" -f "evacuation" --window 24h     (only entries published in the last 24 hours)
+        python cli.py -k "fire" --budget 120 --feed-budget 60    (stop after 2 minutes, keeping what was found)
+        python cli.py -k "fire" -f "evacuation" --store          (keep the article text, then...)
+        python cli.py -k "flood" -f "shelter" --offline          (...re-query it with new keywords, no network)
+
+    The scraper (requests, feedparser, BeautifulSoup, PlayWright) is only imported once the
+    arguments are parsed, so --help and argument errors return straight away
+'''
+
+# every output file holds one profile, so the profile column is left out
+COLUMNS = [field for field in FIELDS if field != 'Profile']
+
+
+def split_words(text: str) -> list[str]:
+    '''
+        Comma separated words, same as the console input
+    '''
+    return [word.strip() for word in text.split(',') if word.strip()]
+
+
+def read_words(path: str) -> list[str]:
+    '''
+        Words from a text file: one per line (or comma separated), # starts a comment
+    '''
+    words = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            words.extend(split_words(line.split('#', 1)[0]))
+    return words
+
+
+def get_profiles(args) -> list[Profile]:
+    if args.profiles:
+        return load_profiles(args.profiles)
+    keywords = split_words(args.keywords or '') + (read_words(args.keywords_file) if args.keywords_file else [])
+    feedwords = split_words(args.feedwords or '') + (read_words(args.feedwords_file) if args.feedwords_file else [])
+    return [Profile('default', keywords, feedwords)]
+
+
+def output_path(output_dir: str, profile: Profile, single: bool, extension: str) -> str:
+    # a lone keyword set keeps the GUI's file name
+    return os.path.join(output_dir, f'news_articles{extension}' if single else f'{profile.name}{extension}')
+
+
+def open_sinks(paths: dict[str, str], append: bool) -> dict[str, ResultSink]:
+    '''
+        One sink per profile. Parquet files can't be appended to, so each daemon cycle gets its own file
+    '''
+    sinks = {}
+    try:
+        for name, path in paths.items():
+            root, extension = os.path.splitext(path)
+            if append and extension == '.parquet':
+                path = f'{root}-{time.strftime("%Y%m%d-%H%M%S")}{extension}'
+            sinks[name] = open_sink(path, COLUMNS, append)
+    except Exception:
+        for sink in sinks.values():
+            sink.close()
+        raise
+    return sinks
+
+
+async def run_cycle(crawl: Crawl, stream_webfeeds, sinks: dict[str, ResultSink], budget: float = None, feed_budget: float = None):
+    '''
+        One pass over every feed, writing each profile's articles to its sink as they are confirmed.
+        Feeds still going when a budget runs out are cut off, and what they found is kept
+    '''
+    start_time = time.time()
+    found = 0
+    try:
+        async with flushing(list(sinks.values())):
+            async for article in stream_webfeeds(crawl, budget=budget, feed_budget=feed_budget):
+                if not found:
+                    logging.info(f'First article after {time.time() - start_time:.3f}s')
+                found += 1
+                logging.debug(f'Found: {article}')
+                sinks[article['Profile']].write(article)
+        crawl.finish()
+    finally:
+        for name, sink in sinks.items():
+            sink.close()
+            print(f'{name}: {sink.rows} articles -> {sink.path}')
+        print_summary(crawl)
+    logging.info(f'Cycle finished in {time.time() - start_time:.3f}s')
+
+
+def run_offline(profiles: list[Profile], paths: dict[str, str], window: str):
+    '''
+        Match the profiles against the article text store instead of the sites (see Crawl.requery)
+    '''
+    start_time = time.time()
+    crawl = Crawl(profiles=profiles, window=window, runs=RunLog(), texts=TextStore())
+    sinks = open_sinks(paths, append=False)
+    try:
+        print(f'Re-querying {crawl.texts.stats()["articles"]} stored articles...')
+        for article in crawl.requery():
+            sinks[article['Profile']].write(article)
+    finally:
+        crawl.texts.close()
+        for name, sink in sinks.items():
+            sink.close()
+            print(f'{name}: {sink.rows} articles -> {sink.path}')
+    logging.info(f'Re-query finished in {time.time() - start_time:.3f}s')
+
+
+async def write_snapshots(path: str, interval: float):
+    '''
+        Daemon mode: keep rewriting the metrics report so it can be watched while running
+    '''
+    while True:
+        await asyncio.sleep(interval)
+        get_metrics().write(path)
+
+
+async def run(args):
+    profiles = get_profiles(args)
+    if not any(profile.keywords for profile in profiles):
+        print('No keywords given. Nothing to do')
+        return
+
+    os.makedirs(args.output, exist_ok=True)
+    extension = f'.{args.format}'
+    paths = {profile.name: output_path(args.output, profile, not args.profiles, extension) for profile in profiles}
+    if args.offline:
+        return run_offline(profiles, paths, args.window)
+
+    # heavy imports only from here on
+    from scraper import new_crawl, close_crawl, stream_webfeeds
+
+    metrics_path = args.metrics or os.path.join(args.output, os.path.basename(METRICS_PATH))
+    get_metrics().reset()
+
+    # the daemon remembers evaluated articles so each cycle only reports new ones
+    crawl = new_crawl(profiles, incremental=args.daemon or INCREMENTAL, window=args.window, store=args.store)
+    stop = asyncio.Event()
+    snapshots = None
+    if args.daemon:
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        except (NotImplementedError, AttributeError):
+            pass # no signal handlers on Windows event loops, Ctrl+C still works
+        snapshots = asyncio.create_task(write_snapshots(metrics_path, METRICS_SNAPSHOT_SECONDS))
+
+    try:
+        while True:
+            # results reach disk as they are found, so an interrupted cycle keeps what it had
+            await run_cycle(crawl, stream_webfeeds, open_sinks(paths, append=args.daemon), args.budget, args.feed_budget)
+            if not args.daemon:
+                break
+            crawl.state.evict()
+            get_metrics().write(metrics_path)
+
+            # sleep until the next cycle, keeping the engine, sessions and browser warm
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=args.interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            crawl = Crawl(
+                profiles=profiles, state=crawl.state, cache=crawl.cache, window=args.window, runs=crawl.runs, texts=crawl.texts,
+            )
+    finally:
+        if snapshots:
+            snapshots.cancel()
+        await close_crawl(crawl)
+        get_metrics().write(metrics_path)
+        print(f'Run metrics -> {metrics_path}')
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='newscrape', description='Headless news scraper')
+    parser.add_argument('-k', '--keywords', help='comma separated keywords to look for in article titles')
+    parser.add_argument('-f', '--feedwords', help='comma separated keywords to look for in article bodies')
+    parser.add_argument('--keywords-file', help='file of title keywords, one per line')
+    parser.add_argument('--feedwords-file', help='file of body keywords, one per line')
+    parser.add_argument('--profiles', help='JSON file of named keyword profiles (one output file per profile)')
+    parser.add_argument('-o', '--output', default='output', help='output folder (default: output)')
+    parser.add_argument('--format', default='csv', choices=[extension[1:] for extension in SINKS],
+                        help='output format (default: csv, parquet needs pyarrow)')
+    parser.add_argument('--window', default=WINDOW,
+                        help='only articles published in this window: 24h, 90m, 7d, 2w, an ISO date, '
+                             'or last-run (since the last successful run). Default: no window')
+    parser.add_argument('--budget', type=float, default=RUN_BUDGET,
+                        help='seconds for the whole run (each daemon cycle). Feeds still going are cut off, '
+                             'what they found is kept. Default: no limit')
+    parser.add_argument('--feed-budget', type=float, default=FEED_BUDGET, help='seconds for each feed. Default: no limit')
+    parser.add_argument('--store', action='store_true', default=TEXT_STORE,
+                        help='keep the text of every article fetched (read in full) for --offline')
+    parser.add_argument('--offline', action='store_true',
+                        help='re-query the stored article text (see --store) instead of crawling')
+    parser.add_argument('--metrics', help='where to write the JSON metrics report (default: <output>/metrics.json)')
+    parser.add_argument('--daemon', action='store_true', help='keep running, crawling every --interval seconds')
+    parser.add_argument('--interval', type=float, default=15 * 60, help='seconds between daemon cycles (default: 900)')
+    return parser
+
+
+def main(argv: list[str] = None):
+    args = get_parser().parse_args(argv)
+    if args.profiles and (args.keywords or args.feedwords or args.keywords_file or args.feedwords_file):
+        get_parser().error('--profiles cannot be combined with keywords/feedwords')
+    if args.offline and args.daemon:
+        get_parser().error('--offline cannot be combined with --daemon')
+    try:
+        window_start(args.window)
+    except ValueError as e:
+        get_parser().error(str(e))
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print('Stopped')
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support() # parse workers in a PyInstaller bundle
+    main(sys.argv[1:])
@@ -0,0 +1,254 @@
+import re
+import time
+import hashlib
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from feeds.matcher import KeywordMatcher
+from feeds.profiles import Profile
+from storage.crawlstate import CrawlState
+from storage.httpcache import HttpCache
+from storage.runlog import RunLog
+from storage.textstore import TextStore
+from net.urls import canonical_url
+
+'''
+    Per-run context handed to every feed
+'''
+
+WINDOW_RE = re.compile(r'(\d+(?:\.\d+)?)\s*([mhdw])', re.IGNORECASE)
+WINDOW_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+
+
+def window_start(window: str, last_run: float = None, now: datetime = None) -> datetime:
+    '''
+        Start of a published-date window (UTC): "24h", "90m", "7d", "2w" back from now, an ISO date/time
+        (local time unless it gives an offset), or "last-run" (the start of the last successful run given)
+
+        Returns None for no window (no window given, or "last-run" without an earlier run).
+        Raises ValueError if the window can't be read
+    '''
+    if not window:
+        return None
+    window = window.strip()
+    if window.lower() == 'last-run':
+        return datetime.fromtimestamp(last_run, timezone.utc) if last_run else None
+    found = WINDOW_RE.fullmatch(window)
+    if found:
+        amount, unit = found.groups()
+        return (now or datetime.now(timezone.utc)) - timedelta(**{WINDOW_UNITS[unit.lower()]: float(amount)})
+    try:
+        start = datetime.fromisoformat(window)
+    except ValueError:
+        raise ValueError(f'Unknown window {window!r}: use e.g. 24h, 90m, 7d, 2w, an ISO date or last-run') from None
+    return start.astimezone(timezone.utc) # naive times are taken as local
+
+
+@dataclass
+class Crawl:
+    '''
+        Everything the feeds share for one run: the keyword profiles and (optionally)
+        the crawl state used to skip articles evaluated in earlier runs and the conditional GET cache
+
+        With a window (see window_start), feed entries published before since are dropped before their
+        articles are fetched. Entries that don't say when they were published are kept. The run log
+        remembers when the last successful run started (for the "last-run" window)
+
+        With a text store, the text of every article fetched is kept, and requery() runs the
+        profiles against the stored articles instead of the sites
+
+        Feeds match against title_words/feed_words, the union of every profile's keywords, so each
+        article is fetched and scanned once however many profiles there are
+    '''
+    profiles: list[Profile]
+    state: CrawlState = None
+    cache: HttpCache = None
+    window: str = None
+    runs: RunLog = None
+    texts: TextStore = None
+    since: datetime = field(init=False) # start of the window (None = no window)
+    started: float = field(default_factory=time.time, init=False)
+    outcomes: dict = field(default_factory=dict, init=False) # feed -> how it ended (see feed_done)
+    title_words: KeywordMatcher = field(init=False)
+    feed_words: KeywordMatcher = field(init=False)
+    profile: str = field(init=False) # fingerprint of every profile's keywords (crawl state/cache namespace)
+    claimed: set = field(default_factory=set, init=False) # canonical urls some feed is already handling
+
+
+    def __post_init__(self):
+        whole_word = all(profile.whole_word for profile in self.profiles)
+        self.title_words = KeywordMatcher([w for p in self.profiles for w in p.keywords], whole_word=whole_word)
+        self.feed_words = KeywordMatcher([w for p in self.profiles for w in p.feedwords], whole_word=whole_word)
+        key = ':'.join(f'{p.title_words.fingerprint}:{p.feed_words.fingerprint}' for p in self.profiles)
+        self.profile = hashlib.sha1(key.encode()).hexdigest()
+        self.since = window_start(self.window, self.runs.last_success(self.profile) if self.runs else None)
+
+
+    @property
+    def feed_namespace(self) -> str:
+        '''
+            HTTP cache namespace for RSS/ATOM validators: the profiles and the window. Entries outside the
+            window are never evaluated, so a 304 from a run with another window can't stand in for them
+        '''
+        return f'{self.profile}:{self.window}' if self.window else self.profile
+
+
+    @property
+    def since_date(self) -> date:
+        '''
+            The window's first day, local time (for listings that only give dates). None for no window
+        '''
+        return self.since.astimezone().date() if self.since else None
+
+
+    @property
+    def since_timestamp(self) -> float:
+        '''
+            The window's start as UNIX seconds (picklable, for the parse workers). None for no window
+        '''
+        return self.since.timestamp() if self.since else None
+
+
+    def in_window(self, published: str) -> bool:
+        '''
+            Whether an ISO 8601 published date/time (UTC) is in the window. Undated is always in
+        '''
+        if not self.since or not published:
+            return True
+        if len(published) == 10: # a date only (listings)
+            return published >= self.since_date.isoformat()
+        return published >= self.since.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+    def store_text(self, link: str, title: str, summary: str, outlet: str, published: str, text: str):
+        '''
+            Keep an article's text for offline re-querying (if there is a text store)
+        '''
+        if self.texts:
+            self.texts.put(canonical_url(link), link, title, summary, outlet, published, text)
+
+
+    def requery(self):
+        '''
+            Offline re-query: match the profiles against every article in the text store (in the window)
+            the same way a crawl would: title keywords in the title or summary, then feedwords in the text.
+            Only articles a crawl has fetched are stored, so ones whose titles never matched aren't there
+
+            Yields result rows (see result), Latency being the time taken to match the article
+        '''
+        if not self.texts or not self.title_words:
+            return
+        for article in self.texts.articles():
+            start = time.perf_counter()
+            if not self.in_window(article['published']):
+                continue
+            title_found = self.title_words.findall(article['title']) | self.title_words.findall(article['summary'])
+            candidates = self.title_profiles(title_found)
+            if not candidates:
+                continue
+            body_found = self.feed_words.findall(article['text'])
+            for profile in self.body_profiles(candidates, body_found):
+                yield self.result(
+                    profile, article['title'], article['url'], article['outlet'], article['published'],
+                    title_found, body_found, time.perf_counter() - start,
+                )
+
+
+    def feed_done(self, feed: str, status: str, results: int, seconds: float, gave_up: int = 0):
+        '''
+            Record how a feed ended: finished, partial (the fetch engine gave up on some of its requests),
+            failed (on an error) or cut off (out of time budget)
+        '''
+        self.outcomes[feed] = {'status': status, 'results': results, 'seconds': round(seconds, 3), 'gave_up': gave_up}
+
+
+    def summary(self) -> dict[str, list[str]]:
+        '''
+            The feeds by how they ended, e.g. {'finished': [...], 'cut off': [...]}
+        '''
+        summary = {}
+        for feed, outcome in self.outcomes.items():
+            summary.setdefault(outcome['status'], []).append(feed)
+        return summary
+
+
+    def finish(self):
+        '''
+            The run went through every feed: remember it as the last successful run, unless a feed failed,
+            was cut off or is partial (articles given up on would otherwise fall out of a "last-run" window)
+        '''
+        if self.runs and all(outcome['status'] == 'finished' for outcome in self.outcomes.values()):
+            self.runs.record(self.profile, self.started)
+
+
+    def title_profiles(self, found: set[str]) -> list[Profile]:
+        '''
+            Profiles whose keywords are among the title keywords found
+        '''
+        return [profile for profile in self.profiles if profile.has_title_match(found)]
+
+
+    def body_profiles(self, candidates: list[Profile], found: set[str]) -> list[Profile]:
+        '''
+            Candidate profiles whose feedwords are among the body feedwords found
+        '''
+        return [profile for profile in candidates if profile.has_body_match(found)]
+
+
+    def scan_done(self, candidates: list[Profile]):
+        '''
+            Returns a check for the article scan: stop reading once every candidate profile has a feedword
+        '''
+        return lambda found: all(profile.has_body_match(found) for profile in candidates)
+
+
+    def result(self, profile: Profile, title: str, link: str, outlet: str, published: str,
+               title_found: set[str], body_found: set[str], latency: float) -> dict:
+        '''
+            One result row: an article confirmed for a profile
+        '''
+        return {
+            'Profile': profile.name,
+            'Title': title,
+            'Link': link,
+            'Outlet': outlet,
+            'Published': published,
+            'Keywords': profile.matched_keywords(title_found, body_found),
+            'Latency': round(latency, 3),
+        }
+
+
+    def claim(self, link: str) -> bool:
+        '''
+            Run-wide dedup across every feed. Returns True the first time an article (by canonical url)
+            is claimed, False if another feed already has it
+        '''
+        key = canonical_url(link)
+        if key in self.claimed:
+            return False
+        self.claimed.add(key)
+        return True
+
+
+    def unseen(self, links: list[str]) -> list[str]:
+        '''
+            Returns the links that still need evaluating (all of them without a crawl state)
+        '''
+        if not self.state:
+            return links
+        keys = {link: canonical_url(link) for link in links}
+        unseen = set(self.state.unseen(list(keys.values()), self.profile))
+        return [link for link in links if keys[link] in unseen]
+
+
+    def record(self, link: str, content_hash: str, matched: bool):
+        if self.state:
+            self.state.record(canonical_url(link), self.profile, content_hash, matched)
+
+
+def print_summary(crawl: Crawl):
+    '''
+        Which feeds finished, are partial, failed or were cut off (out of time budget), and how many results each gave
+    '''
+    for feed, outcome in crawl.outcomes.items():
+        gave_up = f', gave up on {outcome["gave_up"]} requests' if outcome.get('gave_up') else ''
+        print(f'{feed}: {outcome["status"]} ({outcome["results"]} results in {outcome["seconds"]:.1f}s{gave_up})')
@@ -1,40 +1,86 @@
 from dataclasses import dataclass, field
-from bs4 import BeautifulSoup
-from typing import Literal
+from typing import Literal, TYPE_CHECKING
 import asyncio
-from playwright.async_api import Page, async_playwright
 import logging
 import re
-from urllib.parse import urlparse, urljoin
 from contextlib import asynccontextmanager
+from datetime import date
+from net.engine import FetchEngine, get_engine
+from net.browser import BrowserPool, get_browser
+from net.sessions import SessionPool, get_sessions
+from net.ratelimit import RETRYABLE
+from feeds.matcher import KeywordMatcher
+from feeds.crawl import Crawl
+from feeds.parsing import ListingRow, parse_article, parse_listing, run_parser
+from net.urls import outlet_name, resolve_url
+from metrics import Metrics, get_metrics
+import hashlib
+import requests
+import time
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
 
 '''
     For news feeds that require JavaScript.
 '''
 
+# DataTables snippets run inside the listing page
+ALL_ROWS_JS = '''async () => {
+    if (!window.jQuery || !jQuery.fn.dataTable || !jQuery.fn.dataTable.tables().length) return null;
+    const api = jQuery(jQuery.fn.dataTable.tables()[0]).DataTable();
+    await new Promise(resolve => { api.one('draw', resolve); api.page.len(-1).draw(false); setTimeout(resolve, 10000); });
+    return {
+        rows: api.rows({order: 'current', search: 'applied'}).nodes().toArray().map(r => r.outerHTML),
+        total: api.page.info().recordsDisplay,
+    };
+}'''
+PAGE_COUNT_JS = '''() => {
+    if (!window.jQuery || !jQuery.fn.dataTable || !jQuery.fn.dataTable.tables().length) return null;
+    return jQuery(jQuery.fn.dataTable.tables()[0]).DataTable().page.info().pages;
+}'''
+GOTO_PAGE_JS = '''async (i) => {
+    const api = jQuery(jQuery.fn.dataTable.tables()[0]).DataTable();
+    await new Promise(resolve => { api.one('draw', resolve); api.page(i).draw('page'); setTimeout(resolve, 10000); });
+    return api.rows({page: 'current'}).nodes().toArray().map(r => r.outerHTML);
+}'''
+
 @dataclass
 class JSWebFeed:
     base_url: str = field(default_factory=str)
     path: str = field(default_factory=str)
     parser_type: Literal['html', 'xml'] = 'html'
+    engine: FetchEngine = field(default_factory=get_engine, repr=False)
+    browser: BrowserPool = field(default_factory=get_browser, repr=False)
+    sessions: SessionPool = field(default_factory=get_sessions, repr=False)
+    metrics: Metrics = field(default_factory=get_metrics, repr=False)
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    }
+    # fetch article pages over plain HTTP, only rendering them in the browser if they fail parse_article
+    http_articles: bool = True
+    heading_class: str = None # class of the h1 holding the article title (None = first h1 or <title>)
     
     
     @asynccontextmanager
-    async def get_page(self) -> Page:
+    async def get_page(self) -> 'Page':
         '''
-            Setup a PlayWright browser and return it (automatically closes afterwards)
+            Borrow a page from the shared PlayWright browser (given back to the pool afterwards)
         '''
-        browser = None
-        try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch()
-                page = await browser.new_page()
-                yield page
-        except Exception as e:
-            logging.error(f'Error in PlayWright setup {e}')
-        finally:
-            if browser:
-                await browser.close()
+        async with self.browser.page() as page:
+            yield page
+    
+    
+    @property
+    def outlet(self) -> str:
+        return outlet_name(self.base_url)
+    
+    
+    def resolve_url(self, url: str) -> str:
+        '''
+            Turn paths and scheme-less links into full urls
+        '''
+        return resolve_url(self.base_url, url)
     
     
     async def get_request(self, url: str) -> str:
@@ -43,104 +89,257 @@ class JSWebFeed:
         '''
         async with self.get_page() as p:
             # check for correct URL
-            parsed = urlparse(url)
-        
-            if not parsed.netloc: # path, not url
-                url = urljoin(self.base_url, url)
-            elif not parsed.scheme: # missing scheme
-                url = f"https://{url}"
+            url = self.resolve_url(url)
             
+            start = time.perf_counter()
             try:
-                await p.goto(url)
-
-                return await p.content()
+                with self.metrics.span('browser_render'):
+                    await p.goto(url)
+                    content = await p.content()
+                self.metrics.observe(url, time.perf_counter() - start)
+                self.metrics.add_bytes(url, len(content.encode()))
+                return content
             except Exception as e:
                 logging.debug(f'Error: {e}')
+                self.metrics.error(url, timeout='Timeout' in type(e).__name__)
                 return None
     
-    def get_webfeed(self, title_words: list[str], feed_words: list[str]) -> list[dict]:
+    def get_http_request(self, url: str) -> bytes:
+        '''
+            Get a page over plain HTTP (no JavaScript). Return none if any errors (RETRYABLE ones are raised for the fetch engine)
+        '''
+        try:
+            response = self.sessions.get(url, headers=self.headers)
+            response.raise_for_status()
+            return response.content
+        except RETRYABLE:
+            raise # the fetch engine retries these
+        except requests.RequestException as e:
+            logging.debug(f"Request failed on {url}: {e}")
+        return None
+    
+    
+    async def get_article(self, url: str) -> tuple[str, str]:
+        '''
+            Fetch and parse an article. Plain HTTP first (if http_articles), the browser only
+            for pages that fail the parse_article content check
+        
+            Returns (title, page_text), or None
+        '''
+        url = self.resolve_url(url)
+        with self.metrics.span('article_fetch'):
+            return await self._get_article(url)
+    
+    
+    async def _get_article(self, url: str) -> tuple[str, str]:
+        if self.http_articles:
+            content = await self.engine.submit(self.get_http_request, url)
+            article = await run_parser(parse_article, content, self.parser_type, self.heading_class) if content else None
+            if article:
+                return article
+            logging.debug(f'Plain HTTP content check failed on {url}. Rendering in browser...')
+        
+        content = await self.engine.submit(self.get_request, url)
+        return await run_parser(parse_article, content, self.parser_type, self.heading_class) if content else None
+    
+    
+    async def iter_webfeed(self, crawl: Crawl):
         print('Getting blank webfeed. Returning')
-        return []
+        return
+        yield
 
         
 @dataclass
 class RCMPWebFeed(JSWebFeed):
     base_url: str = "https://rcmp.ca"
     path: str = "/en/news"
+    since: date = None # stop the listing crawl at articles older than this
+    # RCMP articles keep their title in h1.mrgn-tp-md. Pages without it are treated
+    # as not fully loaded (so they get rendered in the browser instead)
+    heading_class: str = "mrgn-tp-md"
     
     
-    async def check_feed_for_word(self, title_words: list[str], url: str) -> list[str]:
+    async def _rows_all(self, p: 'Page', url: str) -> list[ListingRow]:
         '''
-            Recursively goes through each page on the JS news feed.
-        
-            Grabs all links that have keywords in them, then returns the list of links.
+            Load every row in one pass by setting the DataTables page length to "all"
+
+            Returns the rows, or None if the table API isn't there or the server capped the length
+        '''
+        await p.goto(url)
+        await p.wait_for_selector(".paginate_button", state="attached", timeout=10000)
+        try:
+            listing = await p.evaluate(ALL_ROWS_JS)
+        except Exception as e:
+            logging.debug(f'Could not read DataTables rows: {e}')
+            return None
+        if not listing or len(listing['rows']) < listing['total']:
+            return None
+        return await run_parser(parse_listing, ''.join(listing['rows']))
+    
+    
+    async def _rows_parallel(self, url: str, since: date = None) -> list[ListingRow]:
+        '''
+            Fallback: several pages from the browser pool each jump straight to their own
+            DataTables pages (no clicking). Pages after the first one older than since are skipped
+
+            Returns the rows, or None if the table API isn't there
         '''
         async with self.get_page() as p:
-            try:
+            await p.goto(url)
+            await p.wait_for_selector(".paginate_button", state="attached", timeout=10000)
+            total_pages = await p.evaluate(PAGE_COUNT_JS)
+        if total_pages is None:
+            return None
+        
+        pages = {}
+        next_page = 0
+        stop_at = total_pages
+        
+        async def worker():
+            nonlocal next_page, stop_at
+            async with self.get_page() as p:
                 await p.goto(url)
                 await p.wait_for_selector(".paginate_button", state="attached", timeout=10000)
-            
-                # finding max amt of pages
-                pages = await p.query_selector_all('.paginate_button')
-                total_pages = max([int(num) for s in pages for num in re.findall(r'\d+', await s.text_content())])
-                    
-                # recursively going through each page and grab news reports
-                urls = []
-                for i in range(1, total_pages + 1):
-                    # checks for keywords
-                    soup = BeautifulSoup(await p.content(), "html.parser")
-                    descs = soup.find_all("td", class_ ="nws-tbl-desc mrgn-bbtm-md")
-                    links = soup.find_all("a", class_="h4")
-                    urls.extend([
-                        link.get("href") for desc, link in zip(descs, links) 
-                        if any(word.lower() in desc.get_text().lower() for word in title_words)
-                    ])
-                    
-                    # wait until page is loaded, then reload DOM and click next button
-                    try:
-                        if i < total_pages:
-                            await p.wait_for_selector(".paginate_button", state="attached", timeout=10000)
-                            pages = await p.query_selector_all('.paginate_button')
-                            await pages[-1].click()
-                            await p.wait_for_load_state("domcontentloaded")
-                    except Exception as e:
-                        print(f'Error navigating to the next page: {e}')
-                        break
-
-                return urls
+                while next_page < stop_at:
+                    i = next_page
+                    next_page += 1
+                    rows = await run_parser(parse_listing, ''.join(await p.evaluate(GOTO_PAGE_JS, i)))
+                    pages[i] = rows
+                    if since and any(row.published and row.published < since for row in rows):
+                        stop_at = min(stop_at, i + 1)
+        
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.browser.size, total_pages))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers: # if one failed, the others give their pages back
+                task.cancel()
+        return [row for i in sorted(pages) if i < stop_at for row in pages[i]]
+    
+    
+    async def _rows_clicking(self, url: str, since: date = None) -> list[ListingRow]:
+        '''
+            Last resort: click the next button one page at a time
+        '''
+        async with self.get_page() as p:
+            await p.goto(url)
+            await p.wait_for_selector(".paginate_button", state="attached", timeout=10000)
+        
+            # finding max amt of pages
+            pages = await p.query_selector_all('.paginate_button')
+            total_pages = max([int(num) for s in pages for num in re.findall(r'\d+', await s.text_content())])
+                
+            rows = []
+            for i in range(1, total_pages + 1):
+                page_rows = await run_parser(parse_listing, await p.content())
+                rows.extend(page_rows)
+                if since and any(row.published and row.published < since for row in page_rows):
+                    break
+                
+                # wait until page is loaded, then reload DOM and click next button
+                try:
+                    if i < total_pages:
+                        await p.wait_for_selector(".paginate_button", state="attached", timeout=10000)
+                        pages = await p.query_selector_all('.paginate_button')
+                        await pages[-1].click()
+                        await p.wait_for_load_state("domcontentloaded")
+                except Exception as e:
+                    print(f'Error navigating to the next page: {e}')
+                    break
+            return rows
+    
+    
+    async def get_listing(self, url: str, since: date = None) -> list[ListingRow]:
+        '''
+            Get every row of the news listing, newest first, stopping at the first row older than since
+        '''
+        with self.metrics.span('listing'):
+            return await self._get_listing(url, since)
+    
+    
+    async def _get_listing(self, url: str, since: date = None) -> list[ListingRow]:
+        async with self.get_page() as p:
+            rows = await self._rows_all(p, url)
+        if rows is None:
+            logging.debug('Could not load all rows at once. Using parallel page workers...')
+            try:
+                rows = await self._rows_parallel(url, since)
             except Exception as e:
-                logging.error(f'Error checking feed: {e}')
+                logging.debug(f'Parallel page workers failed: {e}')
+        if rows is None:
+            logging.debug('No DataTables API found. Clicking through pages...')
+            rows = await self._rows_clicking(url, since)
+        
+        if since:
+            for i, row in enumerate(rows):
+                if row.published and row.published < since:
+                    return rows[:i]
+        return rows
+    
+    
+    async def check_feed_for_word(self, title_words: KeywordMatcher, url: str, since: date = None) -> list[ListingRow]:
+        '''
+            Goes through every row on the JS news feed (see get_listing).
+        
+            Returns the rows that have keywords in them.
+        '''
+        try:
+            rows = await self.get_listing(url, since)
+            return [row for row in rows if title_words.search(row.desc)]
+        except Exception as e:
+            logging.error(f'Error checking feed: {e}')
 
     
-    async def get_webfeed(self, title_words: list[str], feed_words: list[str]) -> list[dict]:
+    async def iter_webfeed(self, crawl: Crawl):
         '''
-            Get all data from the webfeed links in base_url
+            Get all data from the webfeed links in base_url, yielding articles as soon as they are confirmed
         
-            Returns a list of dictionaries of the title and links corresponding to the keywords
+            Yields result rows (see Crawl.result), one per profile the article matches
         '''
         print(f'Processing {self.base_url}{self.path}...')
-        if not title_words or not await self.get_request(f'{self.base_url}{self.path}'):
-            return []
+        if not crawl.title_words:
+            return
         
-        urls = await self.check_feed_for_word(title_words, f"{self.base_url}{self.path}")
+        # no separate check that the listing is up: check_feed_for_word logs a listing that can't be loaded
+        # the listing is newest first, so it stops at the window's first day (or self.since, whichever is later)
+        since = max(filter(None, (self.since, crawl.since_date)), default=None)
+        rows = await self.check_feed_for_word(crawl.title_words, f"{self.base_url}{self.path}", since) or []
         
-        tasks = [self.get_request(url) for url in urls]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        news_results = []
-        for i, content in enumerate(results):
-            if isinstance(content, Exception) or not content:
-                print(f'Could not fetch url {urls[i]}. Skipping...')
-                continue
-            
-            soup = BeautifulSoup(content, f'{self.parser_type}.parser')
-            page_text = soup.body.get_text().lower() if soup.body else ""
-            if any(word in page_text for word in feed_words):
-                title = soup.find("h1", class_="mrgn-tp-md").get_text()
-                link = urls[i] if urls[i] else "Unknown Link"
-                news_results.append({
-                    'Title': title,
-                    'Link': f'{self.base_url}{link}'
-                })
-       
-        return news_results 
\ No newline at end of file
+        # skip articles another feed is already handling, or that were evaluated in earlier runs
+        rows = {row.link: row for row in rows if row.link and crawl.claim(self.resolve_url(row.link))}
+        unseen = set(crawl.unseen([self.resolve_url(url) for url in rows]))
+        urls = [url for url in rows if self.resolve_url(url) in unseen]
+        
+        async def process_article(url: str):
+            start = time.perf_counter()
+            try:
+                return url, await self.get_article(url), time.perf_counter() - start
+            except Exception as e:
+                logging.debug(f'Error getting article {url}: {e}')
+                return url, None, None
+        
+        # articles go through the shared fetch engine so they count against the host limit
+        tasks = [asyncio.create_task(process_article(url)) for url in urls]
+        try:
+            for done in asyncio.as_completed(tasks):
+                url, article, latency = await done
+                if not article:
+                    print(f'Could not fetch url {url}. Skipping...')
+                    continue
+                
+                title, page_text = article
+                row = rows[url]
+                with self.metrics.span('match'):
+                    title_found = crawl.title_words.findall(row.desc)
+                    body_found = crawl.feed_words.findall(page_text)
+                matched = crawl.body_profiles(crawl.title_profiles(title_found), body_found)
+                crawl.record(self.resolve_url(url), hashlib.sha1(page_text.encode()).hexdigest(), bool(matched))
+                published = row.published.isoformat() if row.published else None
+                crawl.store_text(self.resolve_url(url), title, row.desc, self.outlet, published, page_text)
+                for profile in matched:
+                    yield crawl.result(
+                        profile, title, self.resolve_url(url), self.outlet, published, title_found, body_found, latency
+                    )
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,163 @@
+import re
+import hashlib
+
+'''
+    Multi-keyword matching, compiled once per run and shared by every feed
+'''
+
+# below this many (non whole-word) keywords, plain substring search beats the trie regex (see bench/bench_matcher.py)
+TRIE_MIN_WORDS = 100
+
+
+def _trie_pattern(words: list[str]) -> str:
+    '''
+        Build a regex from a trie of the words, e.g. [fire, fires, flood] -> f(?:ire(?:s)?|lood)
+        At each position the regex engine walks the trie once instead of trying every keyword
+    '''
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {} # end of a word
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        alt = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f'(?:{alt})?' if '' in node else alt # optional + greedy, so longer words win
+
+    return build(trie)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+class KeywordMatcher:
+    '''
+        Finds any of a set of keywords in a single pass over the text.
+        Keywords and text are Unicode case-folded (unless casefold=False), and with whole_word=True
+        a keyword only matches when it isn't part of a longer word
+    '''
+    def __init__(self, words: list[str], whole_word: bool = False, casefold: bool = True):
+        self.whole_word = whole_word
+        self.casefold = casefold
+        self._originals = {}
+        for word in words:
+            key = self._normalize(word.strip())
+            if key and key not in self._originals:
+                self._originals[key] = word.strip()
+        self.words = list(self._originals.values())
+        self._lengths = sorted({len(key) for key in self._originals})
+        self.max_len = self._lengths[-1] if self._lengths else 0
+
+        body = _trie_pattern(list(self._originals))
+        if whole_word:
+            body = rf'(?<!\w)(?:{body})(?!\w)' if body else ''
+        # few keywords: a substring search per keyword is faster than walking the trie at every position
+        self._substring = not whole_word and len(self._originals) < TRIE_MIN_WORDS
+        self._search = re.compile(body) if body else None
+        # lookahead so every start position is tried, not just the ones after the last match
+        self._findall = re.compile(f'(?=({body}))') if body else None
+
+
+    def __bool__(self) -> bool:
+        return bool(self._originals)
+
+
+    def __contains__(self, word: str) -> bool:
+        '''
+            True if word (normalized the same way) is one of the keywords
+        '''
+        return self._normalize(word.strip()) in self._originals
+
+
+    @property
+    def fingerprint(self) -> str:
+        '''
+            Stable hash of the (normalized) keywords and options, e.g. to tell keyword sets apart on disk
+        '''
+        key = repr((sorted(self._originals), self.whole_word, self.casefold))
+        return hashlib.sha1(key.encode()).hexdigest()
+
+
+    def _normalize(self, text: str) -> str:
+        return text.casefold() if self.casefold else text
+
+
+    def search(self, text: str) -> bool:
+        '''
+            Returns True as soon as any keyword is found in the text
+        '''
+        if not self._search or not text:
+            return False
+        text = self._normalize(text)
+        if self._substring:
+            return any(key in text for key in self._originals)
+        return self._search.search(text) is not None
+
+
+    def findall(self, text: str, pos: int = 0, partial: bool = False) -> set[str]:
+        '''
+            Returns every keyword (as given) found in the text, from pos on
+            (the text before pos only counts for the whole-word checks).
+            partial=True means more text may follow, so whole words touching the end aren't reported yet
+        '''
+        if not self._findall or not text:
+            return set()
+        text = self._normalize(text)
+        if self._substring:
+            return {word for key, word in self._originals.items() if key in text[pos:]}
+        found = set()
+        for match in self._findall.finditer(text, pos):
+            hit = match.group(1)
+            if not (partial and self.whole_word and match.start(1) + len(hit) == len(text)):
+                found.add(hit)
+            # the trie prefers the longest word, so shorter words that are prefixes of it are checked here
+            for length in self._lengths:
+                if length >= len(hit):
+                    break
+                if hit[:length] in self._originals and not (self.whole_word and _is_word_char(hit[length])):
+                    found.add(hit[:length])
+        return {self._originals[key] for key in found}
+
+
+class KeywordScanner:
+    '''
+        Feeds text to a KeywordMatcher piece by piece (e.g. while a page is streaming in).
+        Keywords split between two pieces are still found
+    '''
+    def __init__(self, matcher: KeywordMatcher):
+        self.matcher = matcher
+        self.found = set()
+        self._tail = ''
+        self._start = 0 # 1 once the tail is cut: its first char is only there for whole-word checks
+
+
+    def feed(self, text: str, final: bool = False) -> bool:
+        '''
+            Scan the next piece of text. final=True means no more text is coming
+
+            Returns True once any keyword has been found
+        '''
+        matcher = self.matcher
+        if not matcher._search:
+            return False
+        window = self._tail + matcher._normalize(text)
+
+        if matcher._substring:
+            self.found.update(word for key, word in matcher._originals.items() if key in window)
+        else:
+            for match in matcher._search.finditer(window, self._start):
+                # a whole word at the very end might carry on in the next piece
+                if final or not matcher.whole_word or match.end() < len(window):
+                    self.found.update(matcher.findall(window, self._start, partial=not final))
+                    break
+
+        # keep enough to finish a keyword (plus the char before it for whole-word checks)
+        if len(window) > matcher.max_len + 1:
+            self._start = 1
+        self._tail = window[-(matcher.max_len + 1):]
+        return bool(self.found)
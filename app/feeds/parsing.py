@@ -0,0 +1,211 @@
+import re
+import time
+import calendar
+import asyncio
+import logging
+from functools import partial
+from dataclasses import dataclass
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+from feeds.matcher import KeywordMatcher
+from net.urls import entry_link, resolve_url
+from metrics import get_metrics
+from settings import PARSE_PROCESSES
+
+'''
+    CPU-heavy parsing (feedparser, BeautifulSoup). Every parse function is a plain module-level
+    function taking raw bytes and returning small records, so it can run in a worker process.
+    The parsers themselves are imported on first use to keep startup fast
+'''
+
+DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def match_entries(words: KeywordMatcher, entries) -> list[tuple[dict, set[str]]]:
+    '''
+        Keep the feed entries whose title or description has any keywords given
+
+        Returns a list of (entry, keywords matched)
+    '''
+    matches = []
+    for entry in entries:
+        desc = entry.get('description') or entry.get('summary') or ""
+        matched = words.findall(entry.get('title', "")) | words.findall(desc)
+        if matched:
+            matches.append((entry, matched))
+    return matches
+
+
+def entry_timestamp(entry) -> float:
+    '''
+        When a feedparser entry was published (or last updated), as UNIX seconds. None if the feed doesn't say
+    '''
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    return calendar.timegm(parsed) if parsed else None
+
+
+def window_entries(entries, since: float = None) -> list:
+    '''
+        Drop the entries published before since (UNIX seconds). Entries without a date are kept.
+        If the feed is sorted newest first, it is cut off at the first entry older than since
+    '''
+    if since is None:
+        return entries
+    stamps = [entry_timestamp(entry) for entry in entries]
+    dated = [stamp for stamp in stamps if stamp is not None]
+    newest_first = all(a >= b for a, b in zip(dated, dated[1:]))
+    kept = []
+    for entry, stamp in zip(entries, stamps):
+        if stamp is None or stamp >= since:
+            kept.append(entry)
+        elif newest_first:
+            break # the rest is older still
+    return kept
+
+
+def entry_published(entry) -> str:
+    '''
+        When a feedparser entry was published (or last updated), as an ISO 8601 UTC string. None if the feed doesn't say
+    '''
+    parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', parsed) if parsed else None
+
+
+def parse_feed(content: bytes, words: KeywordMatcher, base_url: str, since: float = None) -> list[dict]:
+    '''
+        Parse an RSS/ATOM document and keep the entries whose title/description has any keywords given
+        (only those published since, UNIX seconds, if given: see window_entries)
+
+        Returns a list of records: title, link, description, published (ISO 8601 UTC, or None), keywords (matched)
+    '''
+    import feedparser
+
+    # get feed data (dict of items/entries)
+    feed = feedparser.parse(content)
+    entries = getattr(feed, "entries", None) or \
+        getattr(feed.feed, "items", None) or \
+        getattr(feed.feed, "channel", {}).get("item", []) or \
+        feed.get("items", [])
+
+    if not isinstance(entries, list):
+        logging.debug(f"Unexpected format for entries: {type(entries)}. Skipping...")
+        return []
+    if not entries:
+        logging.debug(f"No entries found. Skipping...")
+        return []
+
+    records = []
+    for entry, matched in match_entries(words, window_entries(entries, since)):
+        link = entry_link(entry)
+        if not link:
+            continue
+        records.append({
+            'title': entry.get('title', ""),
+            'link': resolve_url(base_url, link),
+            'description': entry.get('description') or entry.get('summary') or "",
+            'published': entry_published(entry),
+            'keywords': sorted(matched),
+        })
+    return records
+
+
+def parse_urls(content: bytes, parser_type: str) -> set[str]:
+    '''
+        Returns the RSS/ATOM links on a feed index page
+    '''
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, f'{parser_type}.parser')
+    links = [a.get("href") for a in soup.find_all("a") if a.get("href")]
+    links = [link for link in links if 'rss' in link or 'atom' in link or 'feed' in link]
+    return set(links)
+
+
+def parse_article(content, parser_type: str, heading_class: str = None) -> tuple[str, str]:
+    '''
+        Pull the title (the h1 with heading_class if given, else the first h1 or <title>) and body
+        text out of an article page
+
+        Returns (title, page_text), or None if the page doesn't look like a full article
+    '''
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, f'{parser_type}.parser')
+    if heading_class:
+        heading = soup.find("h1", class_=heading_class)
+    else:
+        heading = soup.find("h1") or soup.title
+    if not heading or not soup.body:
+        return None
+    page_text = soup.body.get_text()
+    if not page_text.strip():
+        return None
+    return heading.get_text(), page_text
+
+
+@dataclass
+class ListingRow:
+    '''
+        One row of a JS news listing
+    '''
+    desc: str
+    link: str
+    published: date = None
+
+
+def parse_listing(content) -> list[ListingRow]:
+    '''
+        Parse the rows out of (part of) an RCMP news table
+    '''
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, "html.parser")
+    rows = []
+    for tr in soup.find_all("tr") or [soup]:
+        descs = tr.find_all("td", class_="nws-tbl-desc")
+        links = tr.find_all("a", class_="h4")
+        found = DATE_RE.search(tr.get_text())
+        row_date = date.fromisoformat(found.group(0)) if found else None
+        rows.extend(
+            ListingRow(desc.get_text(), link.get("href"), row_date)
+            for desc, link in zip(descs, links)
+        )
+    return rows
+
+
+# optional process pool shared by every feed (PARSE_PROCESSES = 0 parses on threads instead)
+_pool = None
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None and PARSE_PROCESSES:
+        _pool = ProcessPoolExecutor(max_workers=PARSE_PROCESSES)
+    return _pool
+
+
+def close_parse_pool():
+    global _pool
+    if _pool:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _timed(fn, *args):
+    '''
+        Runs where the parsing happens (thread or worker process). Returns (result, CPU seconds)
+    '''
+    start = time.thread_time()
+    result = fn(*args)
+    return result, time.thread_time() - start
+
+
+async def run_parser(fn, *args):
+    '''
+        Run a parse function off the event loop: in a worker process if the parse pool is on,
+        otherwise in a thread. Only the raw bytes go in and the small records come back
+    '''
+    pool = get_parse_pool()
+    start = time.perf_counter()
+    if pool is None:
+        result, cpu = await asyncio.to_thread(_timed, fn, *args)
+    else:
+        result, cpu = await asyncio.get_running_loop().run_in_executor(pool, partial(_timed, fn, *args))
+    get_metrics().add_time(f'parse.{fn.__name__}', time.perf_counter() - start, cpu)
+    return result
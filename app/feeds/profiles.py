@@ -0,0 +1,85 @@
+import re
+import json
+from dataclasses import dataclass, field
+from feeds.matcher import KeywordMatcher
+from settings import WHOLE_WORD
+
+'''
+    Named keyword profiles. One crawl can check every article against many profiles
+'''
+
+# names become output file names, so no path separators, drive colons or leading dots
+PROFILE_NAME = re.compile(r'\w([\w .-]*\w)?')
+
+
+@dataclass
+class Profile:
+    '''
+        A named set of keywords (checked against titles) and feedwords (checked against article bodies)
+    '''
+    name: str
+    keywords: list[str]
+    feedwords: list[str]
+    whole_word: bool = WHOLE_WORD
+    title_words: KeywordMatcher = field(init=False, repr=False)
+    feed_words: KeywordMatcher = field(init=False, repr=False)
+
+
+    def __post_init__(self):
+        self.title_words = KeywordMatcher(self.keywords, whole_word=self.whole_word)
+        self.feed_words = KeywordMatcher(self.feedwords, whole_word=self.whole_word)
+
+
+    def has_title_match(self, found: set[str]) -> bool:
+        '''
+            True if any of the (union) title keywords found belong to this profile
+        '''
+        return any(word in self.title_words for word in found)
+
+
+    def has_body_match(self, found: set[str]) -> bool:
+        '''
+            True if any of the (union) feedwords found belong to this profile
+        '''
+        return any(word in self.feed_words for word in found)
+
+
+    def matched_keywords(self, title_found: set[str], body_found: set[str]) -> list[str]:
+        '''
+            The keywords and feedwords found that belong to this profile
+        '''
+        words = {word for word in title_found if word in self.title_words}
+        words |= {word for word in body_found if word in self.feed_words}
+        return sorted(words)
+
+
+def load_profiles(path: str) -> list[Profile]:
+    '''
+        Read profiles from a JSON file, either
+            {"team-a": {"keywords": [...], "feedwords": [...]}, ...}
+        or
+            [{"name": "team-a", "keywords": [...], "feedwords": [...]}, ...]
+    '''
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = [{'name': name, **values} for name, values in data.items()]
+
+    profiles = []
+    for item in data:
+        if not item.get('name'):
+            raise ValueError(f'Profile without a name in {path}')
+        if not isinstance(item['name'], str) or not PROFILE_NAME.fullmatch(item['name']):
+            raise ValueError(
+                f'Bad profile name {item["name"]!r} in {path}: use letters, digits, spaces, "_", "-" and "."'
+                ' (starting and ending with a letter or digit)'
+            )
+        profiles.append(Profile(
+            name=item['name'],
+            keywords=item.get('keywords', []),
+            feedwords=item.get('feedwords', []),
+        ))
+    names = [profile.name for profile in profiles]
+    if len(set(names)) != len(names):
+        raise ValueError(f'Duplicate profile names in {path}')
+    return profiles
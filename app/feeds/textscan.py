@@ -0,0 +1,139 @@
+import re
+import time
+import codecs
+import threading
+from html.parser import HTMLParser
+from feeds.matcher import KeywordMatcher, KeywordScanner
+from metrics import get_metrics
+from settings import ARTICLE_MAX_BYTES, ARTICLE_CHUNK_SIZE
+
+'''
+    Light-weight article text scanning. Strips tags as the page streams in and stops
+    reading as soon as a keyword shows up, instead of building a whole BeautifulSoup tree
+'''
+
+CHARSET_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+class TextExtractor(HTMLParser):
+    '''
+        Incremental tag stripper. Keeps the text inside <body>, minus script/style and similar
+    '''
+    SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.in_body = False
+        self.skip_depth = 0
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            self.in_body = True
+        elif tag in self.SKIP_TAGS:
+            self.skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def handle_data(self, data):
+        if self.in_body and not self.skip_depth:
+            self.parts.append(data)
+
+    def take(self) -> str:
+        '''
+            Returns the text found since the last take()
+        '''
+        text = ''.join(self.parts)
+        self.parts.clear()
+        return text
+
+
+def get_encoding(content_type: str) -> str:
+    '''
+        Charset from a Content-Type header, utf-8 if there isn't a usable one
+    '''
+    found = CHARSET_RE.search(content_type or '')
+    if found:
+        try:
+            return codecs.lookup(found.group(1)).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+
+def is_html(content_type: str) -> bool:
+    '''
+        Missing content types are given the benefit of the doubt
+    '''
+    return not content_type or 'html' in content_type.lower()
+
+
+def scan_chunks(chunks, content_type: str, words: KeywordMatcher, max_bytes: int = ARTICLE_MAX_BYTES, digest=None, done=bool,
+                stop: threading.Event = None, keep: list = None) -> set[str]:
+    '''
+        Strip tags from the chunks of bytes as they come in and look for the words.
+        Stops as soon as done(words found so far) is true (by default: any word found) or max_bytes have been read.
+        If a hashlib digest is given, every byte read is added to it. Once stop is set (the feed was cut off),
+        reading stops at the next chunk. If a keep list is given, the text is appended to it as it is extracted
+
+        Returns the words found (empty if none)
+    '''
+    decoder = codecs.getincrementaldecoder(get_encoding(content_type))(errors='replace')
+    parser = TextExtractor()
+    scanner = KeywordScanner(words)
+    read = 0
+    # CPU time of this thread, summed here and reported once per article (reading the socket isn't counted)
+    extract_time = match_time = 0.0
+
+    try:
+        for chunk in chunks:
+            read += len(chunk)
+            if digest is not None:
+                digest.update(chunk)
+            start = time.thread_time()
+            parser.feed(decoder.decode(chunk))
+            text = parser.take()
+            if keep is not None:
+                keep.append(text)
+            middle = time.thread_time()
+            found = scanner.feed(text)
+            extract_time += middle - start
+            match_time += time.thread_time() - middle
+            if found and done(scanner.found):
+                return scanner.found
+            if read >= max_bytes:
+                break
+            if stop is not None and stop.is_set():
+                return scanner.found
+
+        start = time.thread_time()
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+        text = parser.take()
+        if keep is not None:
+            keep.append(text)
+        middle = time.thread_time()
+        scanner.feed(text, final=True)
+        extract_time += middle - start
+        match_time += time.thread_time() - middle
+        return scanner.found
+    finally:
+        get_metrics().add_time('html_extract', extract_time, extract_time)
+        get_metrics().add_time('match', match_time, match_time)
+
+
+def scan_response(response, words: KeywordMatcher, max_bytes: int = ARTICLE_MAX_BYTES, chunk_size: int = ARTICLE_CHUNK_SIZE, digest=None, done=bool,
+                  stop: threading.Event = None, keep: list = None) -> set[str]:
+    '''
+        Scan a streamed (stream=True) requests response for the words. Non-HTML responses
+        aren't read at all
+
+        Returns the words found, or None if the response isn't HTML
+    '''
+    content_type = response.headers.get('Content-Type', '')
+    if not is_html(content_type):
+        return None
+    chunks = get_metrics().counted(response.url, response.iter_content(chunk_size))
+    return scan_chunks(chunks, content_type, words, max_bytes, digest, done, stop, keep)
@@ -1,12 +1,22 @@
-from concurrent.futures import ThreadPoolExecutor
-import feedparser
+import asyncio
 from dataclasses import dataclass, field
 from typing import Literal
-from bs4 import BeautifulSoup
 import requests
-from settings import MAX_THREADS
+from net.engine import FetchEngine, get_engine
+from net.sessions import SessionPool, get_sessions
+from net.ratelimit import RETRYABLE
+from net.urls import outlet_name, resolve_url
+from feeds.matcher import KeywordMatcher
+from feeds.textscan import scan_response
+from feeds.crawl import Crawl
+from feeds.parsing import parse_feed, parse_urls, run_parser
+from storage.httpcache import HttpCache
+from metrics import Metrics, get_metrics
+from settings import FEED_PIPELINE_DEPTH, RESULT_QUEUE_SIZE
+import hashlib
 import logging
-from urllib.parse import urlparse, urljoin
+import threading
+import time
 
 '''
     For most RSS/ATOM feeds that don't require JavaScript
@@ -25,148 +35,257 @@ class WebFeed:
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     }
     parser_type: Literal["html", "xml"] = "html"
+    engine: FetchEngine = field(default_factory=get_engine, repr=False)
+    sessions: SessionPool = field(default_factory=get_sessions, repr=False)
+    metrics: Metrics = field(default_factory=get_metrics, repr=False)
     
 
-    def get_request(self, url) -> bytes:
+    @property
+    def outlet(self) -> str:
+        return outlet_name(self.base_url)
+
+
+    def resolve_url(self, url: str) -> str:
         '''
-            Get an HTTP request's content. Return none if any errors
+            Turn paths and scheme-less links into full urls
         '''
-        parsed = urlparse(url)
+        return resolve_url(self.base_url, url)
+
 
-        if not parsed.netloc: # path, not url
-            url = urljoin(self.base_url, url)
-        elif not parsed.scheme: # missing scheme
-            url = f"https://{url}"
+    def get_request(self, url) -> bytes:
+        '''
+            Get an HTTP request's content. Return none if any errors (RETRYABLE ones are raised for the fetch engine)
+        '''
+        url = self.resolve_url(url)
 
         try:
-            response = requests.get(url, headers=self.headers, timeout=5)
+            response = self.sessions.get(url, headers=self.headers)
             response.raise_for_status()
             return response.content
-        except requests.Timeout:
-            logging.debug(f"Timeout on {url}. Skipping...")
+        except RETRYABLE:
+            raise # the fetch engine retries these
         except requests.RequestException as e:
             logging.debug(f"Request failed on {url}: {e}")
         return None
-    
 
-    def get_urls(self) -> set[str]:
+
+    def get_conditional(self, url: str, cache_headers: dict) -> tuple[int, bytes, dict]:
+        '''
+            Get an HTTP request, sending the conditional (If-None-Match/If-Modified-Since) headers given
+
+            Returns (status code, content, ETag/Last-Modified validators). Return none if any errors (RETRYABLE ones are raised)
         '''
-            From the base_url given, get all of the RSS or ATOM web feeds
+        url = self.resolve_url(url)
+
+        try:
+            response = self.sessions.get(url, headers={**self.headers, **cache_headers})
+            response.raise_for_status()
+            validators = {key: response.headers[key] for key in ('ETag', 'Last-Modified') if key in response.headers}
+            return response.status_code, response.content, validators
+        except RETRYABLE:
+            raise # the fetch engine retries these
+        except requests.RequestException as e:
+            logging.debug(f"Request failed on {url}: {e}")
+        return None
+
+
+    async def fetch(self, url: str) -> bytes:
+        '''
+            Submit get_request to the shared fetch engine (retried there). Return none if any errors
+        '''
+        return await self.engine.submit(self.get_request, self.resolve_url(url))
+
+
+    async def get_urls(self, cache: HttpCache = None) -> set[str]:
+        '''
+            From the base_url given, get all of the RSS or ATOM web feeds.
+            With a cache, the feed list is reused until its TTL runs out, then revalidated with a conditional GET
         
             Returns a set of RSS/ATOM links
         '''
-        content = self.get_request(f"{self.base_url}{self.path}")
+        page_url = self.resolve_url(f"{self.base_url}{self.path}")
+        if not cache:
+            content = await self.fetch(page_url)
+            if not content:
+                logging.warning(f'Could not get the feed list {page_url}')
+                return set()
+            return await run_parser(parse_urls, content, self.parser_type)
+        
+        links = cache.get_feed_list(page_url)
+        if links is not None:
+            cache.hits += 1
+            return links
 
-        if not content:
+        result = await self.engine.submit(self.get_conditional, page_url, cache.request_headers(page_url))
+        if not result:
+            logging.warning(f'Could not get the feed list {page_url}')
             return set()
-        
-        soup = BeautifulSoup(content, f'{self.parser_type}.parser')
-        links = [a.get("href") for a in soup.find_all("a") if a.get("href")]
-        links = [link for link in links if 'rss' in link or 'atom' in link or 'feed' in link]
-        return set(links)
-    
+        status, content, validators = result
 
-    def check_feed_for_word(self, words: list[str], entries) -> list:
+        if status == 304:
+            links = cache.get_feed_list(page_url, fresh=False)
+            if links:
+                cache.record_not_modified(page_url)
+                cache.put_feed_list(page_url, links) # (re)starts the TTL
+                return links
+            # no list stored to stand in for the page, so ask for all of it
+            result = await self.engine.submit(self.get_conditional, page_url, {})
+            if not result:
+                logging.warning(f'Could not get the feed list {page_url}')
+                return set()
+            status, content, validators = result
+
+        cache.misses += 1
+        links = await run_parser(parse_urls, content, self.parser_type)
+        if not links:
+            # e.g. a consent page or a redesign: not cached, so the next run looks again
+            logging.warning(f'No feeds found on {page_url}')
+            return set()
+        cache.store(page_url, validators, len(content))
+        cache.put_feed_list(page_url, links) # (re)starts the TTL
+        return links
+
+
+    async def fetch_feed(self, url: str, crawl: Crawl) -> tuple[bytes, dict]:
         '''
-            In every feed, check if the title of the entry has any keywords given
-        
-            Returns a list of entries
+            Get an RSS/ATOM document. When the crawl has both a cache and a crawl state, it's a conditional
+            GET and a 304 returns no content (everything in it was already evaluated with these keywords)
+
+            Returns (content, validators to store once the feed is done). Content is none if any errors or a 304
         '''
-        keyword_entries = []
-        if not words or not entries:
-            return []
-            
-        for entry in entries:
-            desc = entry['description']
-            if not desc:
-                desc = entry.get('summary') if entry.get('summary') else ""
-                
-            if any(word in entry['title'].lower() or word in desc for word in words):
-                keyword_entries.append(entry)
-        return keyword_entries
+        url = self.resolve_url(url)
+        if not (crawl.cache and crawl.state):
+            content = await self.fetch(url)
+            if not content:
+                logging.warning(f'Could not get feed {url}')
+            return content, {}
+
+        result = await self.engine.submit(self.get_conditional, url, crawl.cache.request_headers(url, crawl.feed_namespace))
+        if not result:
+            logging.warning(f'Could not get feed {url}')
+            return None, {}
+        status, content, validators = result
+
+        if status == 304:
+            crawl.cache.record_not_modified(url, crawl.feed_namespace)
+            return None, {}
+        crawl.cache.misses += 1
+        return content, validators
     
 
-    def check_entry_for_word(self, words: list[str], content) -> bool:
+    def scan_article(self, url: str, words: KeywordMatcher, done=bool, stop: threading.Event = None, keep: bool = False) -> tuple[set[str], str, str]:
         '''
-            In every entry, check if the body of the article has any keywords given
+            Stream an article and check its body for any keywords given. Stops downloading as soon
+            as done(keywords found so far) is true (by default: one is found), the byte cap is hit
+            or stop is set (the feed was cut off), and skips non-HTML pages entirely
         
-            Returns boolean
-        '''
-        # parse the news article itself
-        soup = BeautifulSoup(content, 'html.parser')
-        page_text = soup.body.get_text().lower() if soup.body else ""
-        if any(word in page_text for word in words): # check to ensure there is talk of keywords within
-            return True
-        return False
+            Returns (keywords found, hash of the bytes read, body text read if keep else None),
+            or None if any errors (RETRYABLE ones are raised)
+        '''
+        url = self.resolve_url(url)
+        digest = hashlib.sha1()
+        # made per call, so a retried fetch doesn't add to the text a failed one left behind
+        kept = [] if keep else None
+
+        try:
+            with (self.metrics.span('article_fetch'),
+                  self.sessions.get(url, headers=self.headers, stream=True) as response):
+                response.raise_for_status()
+                found = scan_response(response, words, digest=digest, done=done, stop=stop, keep=kept)
+                if found is None:
+                    logging.debug(f"Not an HTML page: {url}. Skipping...")
+                return found or set(), digest.hexdigest(), ''.join(kept) if keep else None
+        except RETRYABLE:
+            raise # the fetch engine retries these
+        except requests.RequestException as e:
+            logging.debug(f"Request failed on {url}: {e}")
+        return None
     
     
-    def get_webfeed(self, title_words: list[str], feed_words: list[str]) -> list[dict]:
+    async def iter_webfeed(self, crawl: Crawl):
         '''
-            Get all data from the webfeed links in base_url
+            Get the articles from every feed in base_url. Each feed is parsed as soon as it arrives, its matching
+            articles are scanned straight away, and results are yielded as soon as they are confirmed.
+            At most FEED_PIPELINE_DEPTH raw feed documents are held at once
         
-            Returns a list of dictionaries of the title and links corresponding to the keywords
+            Yields result rows (see Crawl.result), one per profile the article matches
         '''
         print(f'Processing {self.base_url}{self.path}...')
-        urls = self.get_urls()
-        if not urls or not title_words: 
-            return []
-        news_data = []
-        seen_links = set()
+        with self.metrics.span('feed_discovery'):
+            urls = list(await self.get_urls(crawl.cache))
+        if not urls or not crawl.title_words: 
+            return
         
-        # get all feed entries 
-        with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-            all_entries = list(executor.map(self.get_request, urls))
-            
-        # parse through all webfeed links and look for keywords
-        for entry in all_entries:
-            if not entry:
-                continue
-            
-            # get feed data (dict of items/entries)
-            feed = feedparser.parse(entry)
-            entries = getattr(feed, "entries", None) or \
-                getattr(feed.feed, "items", None) or \
-                getattr(feed.feed, "channel", {}).get("item", []) or \
-                feed.get("items", [])
-            
-            if not isinstance(entries, list):
-                logging.debug(f"Unexpected format for entries: {type(entries)}. Skipping...")
-                continue
-            if not entries:
-                logging.debug(f"No entries found. Skipping...")
-                continue
+        results = asyncio.Queue(maxsize=RESULT_QUEUE_SIZE) # bounded, so a slow consumer holds back the crawl
+        feed_slots = asyncio.Semaphore(FEED_PIPELINE_DEPTH)
+        # scans already running on the engine's threads can't be cancelled, this tells them to stop reading
+        stop = threading.Event()
+        
+        async def process_article(link: str, record: dict):
+            # one fetch per article, read until every profile whose title keywords matched is decided
+            candidates = crawl.title_profiles(record['keywords'])
+            # with a text store the whole article is read, so what is kept can be re-queried later
+            keep = bool(crawl.texts)
+            done = (lambda found: False) if keep else crawl.scan_done(candidates)
+            start = time.perf_counter()
+            try:
+                scan = await self.engine.submit(self.scan_article, link, crawl.feed_words, done, stop, keep)
+            except Exception as e:
+                # one bad article (e.g. a page html.parser chokes on) mustn't take down the rest of the outlet
+                logging.warning(f'Error scanning article {link}: {e}')
+                return None
+            latency = time.perf_counter() - start
+            if not scan:
+                return None
+            found, content_hash, text = scan
+            matched = crawl.body_profiles(candidates, found)
+            crawl.record(link, content_hash, bool(matched))
+            if text:
+                crawl.store_text(link, record['title'], record['description'], self.outlet, record['published'], text)
+            for profile in matched:
+                await results.put(crawl.result(
+                    profile, record['title'], link, self.outlet, record['published'], record['keywords'], found, latency
+                ))
+            return scan
+        
+        async def process_feed(url: str):
+            async with feed_slots:
+                with self.metrics.span('feed_fetch'):
+                    content, validators = await self.fetch_feed(url, crawl)
+                if not content:
+                    return
+                size = len(content)
+                # parsing off the event loop (in a worker process if the parse pool is on)
+                # entries older than the window are dropped here, before any article request
+                records = await run_parser(parse_feed, content, crawl.title_words, self.base_url, crawl.since_timestamp)
+                del content # raw bytes aren't needed past this point
             
-            keyword_entries = self.check_feed_for_word(title_words, entries)
+            # skip articles another feed (of any outlet) is already handling, then ones evaluated in earlier runs
+            records = {record['link']: record for record in records if crawl.claim(record['link'])}
+            links = crawl.unseen(list(records))
             
-            # get all links, titles, and content via multithreading for faster iteration
-            links = []
-            titles = []
-
-            for entry in keyword_entries:
-                link = entry.get("link")
-                if not link:
-                    link = entry.get("id") if entry.get("id") else entry.get("guid")
-                logging.debug(f'link processed: {link}')
-                links.append(link)
-                titles.append(entry['title'])
-
-            with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-                contents = set(executor.map(self.get_request, links))
-                
             # for each entry inside of the webfeed that fits the initial keywords, look for secondary keywords
-            for title, link, content in zip(titles, links, contents):
-                if not content:
-                    continue 
-
-                if link in seen_links:
-                    continue
-                
-                if self.check_entry_for_word(feed_words, content):
-                    news_data.append({
-                        'Title': title,
-                        'Link': link
-                    })
-                    seen_links.add(link)
-                
-        return news_data
-    
+            scans = await asyncio.gather(*(process_article(link, records[link]) for link in links))
+            
+            # only remember the feed's validators if every article in it was evaluated (so errors get retried)
+            if crawl.cache and validators and all(scans):
+                crawl.cache.store(self.resolve_url(url), validators, size, crawl.feed_namespace)
+        
+        async def produce():
+            try:
+                await asyncio.gather(*(process_feed(url) for url in urls))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await results.put(None)
+                raise
+            await results.put(None) # done
+        
+        producer = asyncio.create_task(produce())
+        try:
+            while (article := await results.get()) is not None:
+                yield article
+            await producer # surfaces any errors
+        finally:
+            stop.set()
+            producer.cancel()
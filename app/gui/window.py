@@ -1,14 +1,25 @@
 from dataclasses import dataclass
 import logging
+import queue
+import time
+import webbrowser
 import tkinter as tk
 import tkinter.ttk as ttk
+from gui.worker import ScrapeWorker, OUTPUT_PATH
+from metrics import get_metrics
+
+# how often (ms) the window picks up results and refreshes the counters
+POLL_MS = 200
 
 
 class Window(tk.Tk):
     '''
         Instance of tk.Tk with a built in TreeView
+
+        Searches run on the worker (see gui/worker.py) while the window stays responsive: results show up
+        as they are confirmed, with per-outlet counters, and a search can be cancelled or run again
     '''
-    def __init__(self, title: str, w: int, h: int, x: int, y: int):
+    def __init__(self, title: str, w: int, h: int, x: int, y: int, worker: ScrapeWorker = None):
         super().__init__()
         
         self.title(title)
@@ -19,11 +30,22 @@ class Window(tk.Tk):
         self.create_info_labels()
         self.entry = self.create_entry_widget()
         self.tree = self.create_tree_widget()
+        self.offline = tk.BooleanVar(value=False)
         self.submit_txt = self.create_submit_widget()
+        self.progress = self.create_progress_widget()
+        self.results = self.create_results_widget()
 
         # variables for the newscraper
         self.keywords = []
         self.feedwords = []
+        self.worker = worker or ScrapeWorker()
+        self.searching = False
+        self.cancelling = False
+        self.outlet_results = {}
+        self.links = {} # results row -> article link
+
+        self.protocol('WM_DELETE_WINDOW', self.shutdown)
+        self.after(POLL_MS, self.poll)
 
 
     def create_info_labels(self):
@@ -76,17 +98,53 @@ class Window(tk.Tk):
         return tree
     
     def create_submit_widget(self) -> ttk.Label:
-        submit_btn = ttk.Button(self, text='Submit', command=self.shutdown)
-        submit_btn.pack(pady=5)
+        frame = ttk.Frame(self)
+        frame.pack(pady=5)
+        
+        submit_btn = ttk.Button(frame, text='Submit', command=self.submit)
+        submit_btn.pack(side='left', padx=5)
+        
+        cancel_btn = ttk.Button(frame, text='Cancel', command=self.cancel)
+        cancel_btn.pack(side='left', padx=5)
+        
+        offline_btn = ttk.Checkbutton(frame, text='Stored articles only (offline)', variable=self.offline)
+        offline_btn.pack(side='left', padx=5)
 
         submit_txt = tk.StringVar()
-        submit_txt.set('output is in output/news_articles.csv')
+        submit_txt.set(f'output is in {OUTPUT_PATH}')
 
         l4 = ttk.Label(self, textvariable=submit_txt, style='Desk.TLabel')
         l4.pack(pady=5)
 
         return submit_txt
     
+    def create_progress_widget(self) -> ttk.Treeview:
+        columns = ('outlet', 'requests', 'errors', 'mb', 'rate', 'results')
+        progress = ttk.Treeview(self, columns=columns, show='headings', height=5)
+        for column, text, width in zip(columns, ('Outlet', 'Requests', 'Errors', 'MB', 'Req/s', 'Results'), (220, 80, 60, 60, 60, 60)):
+            progress.heading(column, text=text)
+            progress.column(column, width=width, anchor='w' if column == 'outlet' else 'e')
+        progress.pack(pady=5, fill='x')
+        return progress
+
+    def create_results_widget(self) -> ttk.Treeview:
+        frame = ttk.Frame(self)
+        frame.pack(pady=5, fill='both', expand=True)
+        
+        columns = ('title', 'outlet', 'published', 'keywords')
+        results = ttk.Treeview(frame, columns=columns, show='headings')
+        for column, text, width in zip(columns, ('Title', 'Outlet', 'Published', 'Keywords'), (400, 120, 150, 150)):
+            results.heading(column, text=text)
+            results.column(column, width=width)
+        results.pack(side='left', fill='both', expand=True)
+        results.bind('<Double-1>', self.open_result)
+        
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=results.yview)
+        results.configure(yscroll=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+
+        return results
+
     def treeview_add(self):
         text = self.entry.get()
         
@@ -113,9 +171,93 @@ class Window(tk.Tk):
                 self.feedwords.remove(values[1])
             self.tree.delete(item)
             
-    def shutdown(self):
-        if len(self.keywords) != 0:
-            logging.debug('Exiting Window...')
-            self.destroy()
-        else:
+    def submit(self):
+        if len(self.keywords) == 0:
             self.submit_txt.set('At least 1 Keyword NEEDED')
+            return
+        if not self.worker.submit(list(self.keywords), list(self.feedwords), self.offline.get()):
+            self.submit_txt.set('Still searching. Cancel it first to start another search')
+            return
+        
+        self.searching = True
+        self.cancelling = False
+        self.outlet_results = {}
+        self.links = {}
+        self.results.delete(*self.results.get_children())
+        self.progress.delete(*self.progress.get_children())
+        self.submit_txt.set('Searching...')
+
+    def cancel(self):
+        if self.searching:
+            self.cancelling = True
+            self.worker.cancel()
+
+    def poll(self):
+        '''
+            Pick up the worker's messages and refresh the counters (runs on the Tk loop every POLL_MS)
+        '''
+        try:
+            while True:
+                kind, value = self.worker.messages.get_nowait()
+                if kind == 'result':
+                    self.add_result(value)
+                elif kind == 'done':
+                    self.search_done(value)
+        except queue.Empty:
+            pass
+        
+        if self.searching:
+            self.update_progress()
+            state = 'Cancelling' if self.cancelling else 'Searching'
+            self.submit_txt.set(f'{state}... {len(self.links)} articles in {time.time() - self.worker.started:.0f}s')
+        self.after(POLL_MS, self.poll)
+
+    def add_result(self, article: dict):
+        item = self.results.insert('', 'end', values=(
+            article['Title'], article['Outlet'], article['Published'] or '', ', '.join(article['Keywords']),
+        ))
+        self.links[item] = article['Link']
+        self.outlet_results[article['Outlet']] = self.outlet_results.get(article['Outlet'], 0) + 1
+
+    def update_progress(self):
+        '''
+            Requests, errors, MB downloaded, requests per second and results for every outlet so far
+        '''
+        elapsed = max(time.time() - self.worker.started, 1e-6)
+        outlets = {}
+        for host, stats in get_metrics().report()['hosts'].items():
+            outlet = host[4:] if host.startswith('www.') else host
+            totals = outlets.setdefault(outlet, [0, 0, 0])
+            totals[0] += stats['requests']
+            totals[1] += stats['errors'] + stats['timeouts']
+            totals[2] += stats['bytes']
+        for outlet in self.outlet_results:
+            outlets.setdefault(outlet, [0, 0, 0])
+        
+        self.progress.delete(*self.progress.get_children())
+        for outlet, (requests, errors, size) in sorted(outlets.items()):
+            self.progress.insert('', 'end', values=(
+                outlet, requests, errors, f'{size / (1024 * 1024):.1f}', f'{requests / elapsed:.1f}',
+                self.outlet_results.get(outlet, 0),
+            ))
+
+    def search_done(self, summary: dict):
+        self.searching = False
+        self.update_progress()
+        text = f'Search {summary["status"]}: {summary["results"]} articles in {summary["seconds"]:.0f}s, output is in {OUTPUT_PATH}'
+        unfinished = [feed for status, feeds in summary['feeds'].items() if status != 'finished' for feed in feeds]
+        if unfinished:
+            text += f'\nNot finished: {", ".join(unfinished)}'
+        self.submit_txt.set(text)
+
+    def open_result(self, event):
+        item = self.results.identify_row(event.y)
+        if item in self.links:
+            webbrowser.open(self.links[item])
+
+    def shutdown(self):
+        logging.debug('Exiting Window...')
+        self.submit_txt.set('Closing...')
+        self.update_idletasks()
+        self.worker.close()
+        self.destroy()
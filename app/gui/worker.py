@@ -0,0 +1,151 @@
+import sys
+import time
+import queue
+import asyncio
+import logging
+import threading
+from contextlib import aclosing
+from feeds.profiles import Profile
+from sinks import FIELDS, flushing, open_sink
+from metrics import get_metrics
+from settings import METRICS_PATH, TEXT_STORE
+
+'''
+    Runs the scraper on a background thread for the GUI, so the Tk loop never waits on it
+'''
+
+OUTPUT_PATH = 'output/news_articles.csv'
+
+
+class ScrapeWorker:
+    '''
+        A thread with its own asyncio loop that runs one search at a time. The loop stays up between
+        searches, and with it the fetch engine, HTTP sessions and Chromium, so a second search starts warm
+
+        The window reads messages, a thread-safe queue of (kind, value): ('result', row) for every
+        article confirmed, then ('done', summary) once the search has finished, failed or been cancelled.
+        The summary has status, results, seconds and feeds (see Crawl.summary)
+    '''
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='scraper', daemon=True)
+        self.thread.start()
+        self.running = False
+        self.started = None
+        self.outcome = None # summary of the last search, filled in as it ends
+        self._task = None
+
+
+    @property
+    def busy(self) -> bool:
+        return self.running
+
+
+    def submit(self, keywords: list[str], feedwords: list[str], offline: bool = False) -> bool:
+        '''
+            Start a search (offline: against the article text store). Returns False if one is already running
+        '''
+        if self.running:
+            return False
+        self.running = True
+        self.outcome = None
+        self.started = time.time()
+        get_metrics().reset()
+        self.loop.call_soon_threadsafe(self._start, keywords, feedwords, offline)
+        return True
+
+
+    def cancel(self):
+        '''
+            Stop the search running. Articles already confirmed stay in the output
+        '''
+        self.loop.call_soon_threadsafe(self._cancel)
+
+
+    def _start(self, keywords: list[str], feedwords: list[str], offline: bool):
+        # on the worker thread, so a cancel (queued after this) always finds the task
+        self._task = self.loop.create_task(self._search(keywords, feedwords, offline))
+        self._task.add_done_callback(self._finished)
+
+
+    def _cancel(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+
+
+    def _finished(self, task: asyncio.Task):
+        error = None if task.cancelled() else task.exception()
+        if error:
+            logging.error(f'Search failed: {error}')
+        self.messages.put(('done', self.outcome or {
+            'status': f'failed ({error})' if error else 'cancelled',
+            'results': 0, 'seconds': time.time() - self.started, 'feeds': {},
+        }))
+        self.running = False
+
+
+    async def _search(self, keywords: list[str], feedwords: list[str], offline: bool):
+        # the scraper is imported here, on the worker thread, so the window shows up straight away
+        from scraper import new_crawl, close_storage, stream_webfeeds
+
+        crawl = sink = None
+        status = 'finished'
+        try:
+            # inside the try, so a bad WINDOW or an output file that can't be opened is reported as the failure
+            crawl = new_crawl([Profile('default', keywords, feedwords)], store=offline or TEXT_STORE)
+            sink = open_sink(OUTPUT_PATH, fields=[field for field in FIELDS if field != 'Profile'])
+            if offline:
+                if not crawl.texts.stats()['articles']:
+                    # searches only store text with TEXT_STORE on, so say why nothing came back
+                    logging.warning('The article text store is empty')
+                    status = 'found nothing (the article text store is empty: turn on TEXT_STORE in settings.py, or run cli.py with --store, then search online)'
+                for article in crawl.requery():
+                    sink.write(article)
+                    self.messages.put(('result', article))
+                    await asyncio.sleep(0) # lets a cancel through
+            else:
+                async with flushing([sink]), aclosing(stream_webfeeds(crawl)) as articles:
+                    async for article in articles:
+                        sink.write(article)
+                        self.messages.put(('result', article))
+                crawl.finish()
+        except asyncio.CancelledError:
+            status = 'cancelled'
+            raise
+        except Exception as e:
+            logging.error(f'Search failed: {e}')
+            status = f'failed ({e})'
+        finally:
+            if sink:
+                sink.close()
+            if crawl:
+                close_storage(crawl)
+            get_metrics().write(METRICS_PATH)
+            self.outcome = {
+                'status': status,
+                'results': sink.rows if sink else 0,
+                'seconds': time.time() - self.started,
+                'feeds': crawl.summary() if crawl else {},
+            }
+
+
+    async def _close(self):
+        if self._task:
+            self._cancel()
+            await asyncio.gather(self._task, return_exceptions=True) # let the search wind down first
+        if 'scraper' in sys.modules: # nothing to close if no search ever ran
+            from scraper import close_shared
+            await close_shared()
+
+
+    def close(self, timeout: float = 10):
+        '''
+            Cancel any search, close the shared engine, sessions and browser, and stop the thread
+        '''
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), self.loop).result(timeout)
+        except Exception as e:
+            logging.debug(f'Error closing the scraper: {e}')
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
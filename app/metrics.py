@@ -0,0 +1,199 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+'''
+    Run instrumentation: time spent per stage, latency histograms per host, bytes downloaded,
+    errors/timeouts, the peak number of requests in flight and how each feed ended. Written out as a JSON report
+'''
+
+# upper bounds (seconds) of the per-host latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, float('inf'))
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower() or url
+
+
+class Metrics:
+    '''
+        Thread-safe counters shared by the event loop and the fetch engine's threads.
+        Stage times are summed over every call, so concurrent stages can add up to more than the run's wall time.
+        CPU time is only kept for stages that measure it where the work runs (parsing, HTML extraction, matching)
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.started_cpu = time.process_time()
+            self.stages = {}
+            self.hosts = {}
+            self.feeds = {}
+            self.in_flight = 0
+            self.peak_in_flight = 0
+
+
+    def _host(self, host: str) -> dict:
+        if host not in self.hosts:
+            self.hosts[host] = {
+                'requests': 0, 'bytes': 0, 'errors': 0, 'timeouts': 0, 'retries': 0, 'skipped': 0,
+                'latency_total': 0.0, 'latency_max': 0.0, 'histogram': [0] * len(LATENCY_BUCKETS),
+            }
+        return self.hosts[host]
+
+
+    def add_time(self, stage: str, seconds: float, cpu: float = None, calls: int = 1):
+        with self._lock:
+            stats = self.stages.setdefault(stage, {'calls': 0, 'total': 0.0, 'max': 0.0, 'cpu': None})
+            stats['calls'] += calls
+            stats['total'] += seconds
+            stats['max'] = max(stats['max'], seconds / max(calls, 1))
+            if cpu is not None:
+                stats['cpu'] = (stats['cpu'] or 0.0) + cpu
+
+
+    @contextmanager
+    def span(self, stage: str):
+        '''
+            Time a block of code (sync or async) as part of a stage
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+
+    def observe(self, url: str, seconds: float):
+        '''
+            Record one request's latency (time to response headers) against its host
+        '''
+        with self._lock:
+            stats = self._host(host_of(url))
+            stats['requests'] += 1
+            stats['latency_total'] += seconds
+            stats['latency_max'] = max(stats['latency_max'], seconds)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stats['histogram'][i] += 1
+                    break
+
+
+    def add_bytes(self, url: str, size: int):
+        with self._lock:
+            self._host(host_of(url))['bytes'] += size
+
+
+    def counted(self, url: str, chunks):
+        '''
+            Pass chunks of bytes through, adding their size to the host's bytes downloaded
+        '''
+        for chunk in chunks:
+            self.add_bytes(url, len(chunk))
+            yield chunk
+
+
+    def error(self, url: str, timeout: bool = False):
+        with self._lock:
+            self._host(host_of(url))['timeouts' if timeout else 'errors'] += 1
+
+
+    def count(self, url: str, counter: str):
+        '''
+            Add one to a per-host counter: retries, or skipped (requests turned away by the circuit breaker)
+        '''
+        with self._lock:
+            self._host(host_of(url))[counter] += 1
+
+
+    def feed_done(self, feed: str, outcome: dict):
+        '''
+            How a feed's last crawl ended (see Crawl.feed_done)
+        '''
+        with self._lock:
+            self.feeds[feed] = outcome
+
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+
+    def request_finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+    def report(self) -> dict:
+        with self._lock:
+            hosts = {}
+            for host, stats in sorted(self.hosts.items()):
+                requests = stats['requests']
+                hosts[host] = {
+                    'requests': requests,
+                    'bytes': stats['bytes'],
+                    'errors': stats['errors'],
+                    'timeouts': stats['timeouts'],
+                    'retries': stats['retries'],
+                    'skipped': stats['skipped'],
+                    'latency_mean': round(stats['latency_total'] / requests, 4) if requests else None,
+                    'latency_max': round(stats['latency_max'], 4),
+                    'histogram': {
+                        f'le_{bound:g}': count for bound, count in zip(LATENCY_BUCKETS, stats['histogram'])
+                    },
+                }
+            return {
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'elapsed': round(time.time() - self.started, 3),
+                'cpu': round(time.process_time() - self.started_cpu, 3), # this process only (not parse workers)
+                'stages': {
+                    stage: {
+                        'calls': stats['calls'],
+                        'total': round(stats['total'], 4),
+                        'mean': round(stats['total'] / stats['calls'], 4) if stats['calls'] else None,
+                        'max': round(stats['max'], 4),
+                        'cpu': round(stats['cpu'], 4) if stats['cpu'] is not None else None,
+                    } for stage, stats in sorted(self.stages.items())
+                },
+                'hosts': hosts,
+                'feeds': dict(self.feeds),
+                'totals': {
+                    'requests': sum(stats['requests'] for stats in self.hosts.values()),
+                    'bytes': sum(stats['bytes'] for stats in self.hosts.values()),
+                    'errors': sum(stats['errors'] for stats in self.hosts.values()),
+                    'timeouts': sum(stats['timeouts'] for stats in self.hosts.values()),
+                    'retries': sum(stats['retries'] for stats in self.hosts.values()),
+                    'skipped': sum(stats['skipped'] for stats in self.hosts.values()),
+                    'peak_in_flight': self.peak_in_flight,
+                },
+            }
+
+
+    def write(self, path: str):
+        '''
+            Write the report as JSON. The file is replaced in one step, so readers never see half a report
+        '''
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(tmp, path)
+
+
+# one set of metrics shared by the whole run
+_metrics = None
+
+def get_metrics() -> Metrics:
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
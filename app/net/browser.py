@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+from metrics import get_metrics
+from settings import BROWSER_PAGES
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+'''
+    One shared Chromium per run with a bounded pool of reusable contexts and pages
+'''
+
+
+class BrowserPool:
+    '''
+        Starts Chromium on first use and lends out up to `size` pages at a time.
+        Pages are given back to the pool instead of closing the browser after every request
+    '''
+    def __init__(self, size: int = BROWSER_PAGES):
+        self.size = size
+        self._loop = None
+        self._lock = None
+        self._slots = None # at most size pages lent out at once
+        self._playwright = None
+        self._browser = None
+        self._idle = [] # pages given back, ready for reuse
+        self._pages = set() # every page of the running browser
+
+
+    async def _start(self):
+        '''
+            Launch the browser if it isn't running yet (or belongs to an old event loop)
+        '''
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.size)
+            self._playwright = self._browser = None
+
+        async with self._lock:
+            if self._browser and self._browser.is_connected():
+                return
+            with get_metrics().span('browser_launch'):
+                if self._playwright is None:
+                    from playwright.async_api import async_playwright # only loaded once a JS feed needs it
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch()
+            # pages of an earlier browser are gone with it (ones still lent out are thrown away when given back)
+            self._idle = []
+            self._pages = set()
+
+
+    async def _acquire(self) -> 'Page':
+        '''
+            A page for whoever holds a slot: an idle one if there is one, otherwise a new one
+        '''
+        while self._idle:
+            page = self._idle.pop()
+            if not page.is_closed():
+                return page
+            self._pages.discard(page)
+        context = await self._browser.new_context()
+        page = await context.new_page()
+        self._pages.add(page)
+        return page
+
+
+    async def _release(self, page: 'Page', broken: bool = False):
+        '''
+            Give a page back to the pool. Broken or closed pages (and pages of an earlier browser) are thrown away
+        '''
+        if not broken and page in self._pages and not page.is_closed():
+            try:
+                await page.goto('about:blank') # drop the old document so memory doesn't pile up
+                self._idle.append(page)
+                return
+            except Exception as e:
+                logging.debug(f'Could not reset page: {e}')
+        self._pages.discard(page)
+        try:
+            await page.context.close()
+        except Exception:
+            pass
+
+
+    @asynccontextmanager
+    async def page(self) -> 'Page':
+        '''
+            Borrow a page from the pool (given back afterwards)
+        '''
+        try:
+            await self._start()
+        except Exception as e:
+            logging.error(f'Error in PlayWright setup {e}')
+            raise
+
+        slots = self._slots
+        with get_metrics().span('browser_page_wait'):
+            await slots.acquire()
+        try:
+            try:
+                page = await self._acquire()
+            except Exception as e:
+                logging.error(f'Error in PlayWright setup {e}')
+                raise
+
+            broken = False
+            try:
+                yield page
+            except Exception:
+                broken = True
+                raise
+            finally:
+                await self._release(page, broken)
+        finally:
+            slots.release() # every slot taken is given back, whatever happened to the page
+
+
+    async def close(self):
+        '''
+            Close the browser and stop PlayWright. The next page() starts a fresh one
+        '''
+        try:
+            if self._browser:
+                await self._browser.close()
+            if self._playwright:
+                await self._playwright.stop()
+        except Exception as e:
+            logging.debug(f'Error closing browser: {e}')
+        finally:
+            self._browser = self._playwright = None
+            self._idle = []
+            self._pages = set()
+
+
+# one browser pool shared by every JS feed
+_browser = None
+
+def get_browser() -> BrowserPool:
+    global _browser
+    if _browser is None:
+        _browser = BrowserPool()
+    return _browser
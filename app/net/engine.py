@@ -0,0 +1,143 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import partial
+from urllib.parse import urlparse
+from metrics import get_metrics
+from net.ratelimit import RETRYABLE, HostController, backoff
+from settings import MAX_IN_FLIGHT, MAX_PER_HOST, MAX_RETRIES
+
+'''
+    Shared asyncio fetch engine. Every feed submits its requests here, so the whole run
+    has one global in-flight limit and one (adaptive) limit per host instead of nested thread pools
+'''
+
+# a list set here (e.g. by a feed's task) collects the urls given up on in that context, tasks started from it share the list
+gave_up = ContextVar('gave_up', default=None)
+
+
+class FetchEngine:
+    '''
+        Runs fetch functions under a global and a per-host limit (see net/ratelimit.py), retrying the
+        ones that raise a RETRYABLE error. Blocking functions run on one shared executor, coroutine
+        functions are awaited directly
+    '''
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_per_host: int = MAX_PER_HOST, max_retries: int = MAX_RETRIES):
+        self.max_in_flight = max_in_flight
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.executor = None
+        self._loop = None
+        self._global = None
+        self._hosts = {}
+
+
+    def _bind(self) -> asyncio.AbstractEventLoop:
+        '''
+            asyncio primitives belong to one event loop, so rebuild them if the running loop changes
+        '''
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global = asyncio.Semaphore(self.max_in_flight)
+            for controller in self._hosts.values():
+                controller.bind() # keeps what it learned about the host
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='fetch')
+        return loop
+
+
+    def host(self, url: str) -> HostController:
+        '''
+            Get (or make) the controller for the host of the url
+        '''
+        host = urlparse(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = HostController(host, self.max_per_host)
+            self._hosts[host].bind()
+        return self._hosts[host]
+
+
+    async def _run(self, loop, fn, url: str, *args):
+        get_metrics().request_started()
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                return await fn(url, *args)
+            return await loop.run_in_executor(self.executor, partial(fn, url, *args))
+        finally:
+            get_metrics().request_finished()
+
+
+    async def submit(self, fn, url: str, *args):
+        '''
+            Run fn(url, *args) once a host slot and a global slot are free. If fn raises a RETRYABLE
+            error it is retried (up to max_retries times, with jittered exponential backoff)
+
+            Returns whatever fn returns, or None if every try failed or the host's circuit is open
+        '''
+        loop = self._bind()
+        metrics = get_metrics()
+        host = self.host(url)
+
+        for attempt in range(self.max_retries + 1):
+            while not host.allow():
+                if host.is_open:
+                    metrics.count(url, 'skipped')
+                    logging.debug(f'{host.host} is paused. Skipping {url}')
+                    _give_up(url)
+                    return None
+                await host.wait() # a trial request is checking whether the host is back
+
+            # host first, so a busy host doesn't hold global slots other hosts could use
+            await host.acquire()
+            try:
+                async with self._global:
+                    # timed once a global slot is held, so waiting behind other hosts isn't held against this one
+                    start = time.perf_counter()
+                    result = await self._run(loop, fn, url, *args)
+            except RETRYABLE as e:
+                host.release(time.perf_counter() - start, e)
+                error = e
+            except BaseException:
+                host.cancel()
+                raise
+            else:
+                host.release(time.perf_counter() - start)
+                return result
+
+            if attempt < self.max_retries and not host.is_open:
+                metrics.count(url, 'retries')
+                delay = backoff(attempt, getattr(error, 'retry_after', None))
+                logging.debug(f'{error} on {url}. Retrying in {delay:.1f}s...')
+                await asyncio.sleep(delay)
+
+        logging.warning(f'Giving up on {url}: {error}')
+        _give_up(url)
+        return None
+
+
+    def close(self):
+        '''
+            Shut down the worker threads. The engine can still be used afterwards (threads are remade)
+        '''
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+def _give_up(url: str):
+    urls = gave_up.get()
+    if urls is not None:
+        urls.append(url)
+
+
+# one engine shared by every feed
+_engine = None
+
+def get_engine() -> FetchEngine:
+    global _engine
+    if _engine is None:
+        _engine = FetchEngine()
+    return _engine
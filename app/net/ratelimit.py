@@ -0,0 +1,182 @@
+import time
+import random
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+import requests
+from settings import (
+    MAX_PER_HOST, START_PER_HOST, TARGET_LATENCY, RETRY_BACKOFF, RETRY_BACKOFF_MAX, BREAKER_FAILURES, BREAKER_COOLDOWN,
+)
+
+'''
+    Per-host flow control for the fetch engine: an adaptive concurrency limit (AIMD on latency and
+    429/503 responses), jittered exponential backoff between retries and a circuit breaker
+'''
+
+THROTTLE_STATUSES = {429, 503} # the host is asking us to slow down
+RETRY_STATUSES = THROTTLE_STATUSES | {502, 504}
+
+
+class Throttled(requests.HTTPError):
+    '''
+        A response with a retryable status (see RETRY_STATUSES). retry_after is in seconds, if the host sent one
+    '''
+    def __init__(self, *args, retry_after: float = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retry_after = retry_after
+
+
+# errors worth another try: fetch functions let these through to the engine instead of returning None
+RETRYABLE = (requests.Timeout, requests.ConnectionError, Throttled)
+
+
+def parse_retry_after(value: str) -> float:
+    '''
+        Retry-After is either seconds or an HTTP date. Returns seconds, or None if missing/unreadable
+    '''
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt: int, retry_after: float = None) -> float:
+    '''
+        Seconds to wait before retry number attempt (0-based): full jitter over an exponential ceiling,
+        or the host's Retry-After if it asked for longer
+    '''
+    delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, RETRY_BACKOFF_MAX))
+    return delay
+
+
+class HostController:
+    '''
+        Concurrency limit for one host that adapts as requests finish: grows by about one per round of
+        fast successes, halves when the host throttles us (429/503) and shrinks while it answers slower
+        than TARGET_LATENCY. After BREAKER_FAILURES failures in a row the circuit opens and requests are
+        turned away for BREAKER_COOLDOWN seconds, then one trial request decides whether it closes again
+    '''
+    def __init__(self, host: str, max_limit: int = MAX_PER_HOST, start_limit: int = START_PER_HOST):
+        self.host = host
+        self.max_limit = max_limit
+        self.limit = float(max(1, min(start_limit, max_limit)))
+        self.active = 0
+        self.latency = None # moving average of request time
+        self.failures = 0 # in a row
+        self.open_until = 0.0
+        self.paused_until = 0.0 # Retry-After
+        self.trips = 0
+        self._trial = False # half-open: one request is testing the host
+        self._changed = None
+
+
+    def bind(self):
+        '''
+            asyncio primitives belong to one event loop (the engine rebinds when the loop changes)
+        '''
+        self._changed = asyncio.Event()
+        self.active = 0
+
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+
+    def allow(self) -> bool:
+        '''
+            False while the circuit is open, or while a half-open trial request is still out (wait() for it)
+        '''
+        if self.is_open:
+            return False
+        if self.open_until and not self._trial:
+            self._trial = True # first request after the cooldown is the trial
+            return True
+        return not self._trial
+
+
+    async def wait(self):
+        '''
+            Wait until a request to this host finishes
+        '''
+        self._changed.clear()
+        await self._changed.wait()
+
+
+    async def acquire(self):
+        try:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                if self.active < max(1, int(self.limit)):
+                    self.active += 1
+                    return
+                await self.wait()
+        except asyncio.CancelledError:
+            # a trial cancelled before it got a slot would otherwise leave every later request waiting on it
+            self._trial = False
+            self._changed.set()
+            raise
+
+
+    def release(self, seconds: float, error: Exception = None):
+        '''
+            A request finished after seconds, with a retryable error or without (non-retryable errors count as done)
+        '''
+        self.active -= 1
+        if error is None:
+            self._success(seconds)
+        else:
+            self._failure(error)
+        self._changed.set()
+
+
+    def cancel(self):
+        '''
+            A request was given up on before finishing (the run was cancelled). Counts as neither
+        '''
+        self.active -= 1
+        self._trial = False
+        self._changed.set()
+
+
+    def _success(self, seconds: float):
+        self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+        self.failures = 0
+        if self.open_until:
+            logging.info(f'{self.host} is answering again, resuming requests')
+            self.open_until = 0.0
+            self._trial = False
+        if self.latency > TARGET_LATENCY:
+            self.limit = max(1.0, self.limit - 1 / self.limit)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+    def _failure(self, error: Exception):
+        self.failures += 1
+        if isinstance(error, Throttled) and error.response is not None and error.response.status_code in THROTTLE_STATUSES:
+            self.limit = max(1.0, self.limit / 2)
+            if error.retry_after:
+                self.paused_until = max(self.paused_until, time.monotonic() + min(error.retry_after, BREAKER_COOLDOWN))
+        else:
+            self.limit = max(1.0, self.limit * 0.75)
+
+        if not self.is_open and (self._trial or self.failures >= BREAKER_FAILURES):
+            self.open_until = time.monotonic() + BREAKER_COOLDOWN
+            self._trial = False
+            self.trips += 1
+            logging.warning(
+                f'{self.host}: {self.failures} failed requests in a row ({error}). '
+                f'Pausing requests to it for {BREAKER_COOLDOWN}s'
+            )
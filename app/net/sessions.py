@@ -0,0 +1,100 @@
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from metrics import get_metrics
+from net.ratelimit import RETRY_STATUSES, Throttled, parse_retry_after
+from settings import POOL_MAXSIZE, POOL_BLOCK, KEEP_ALIVE, REQUEST_TIMEOUT
+
+'''
+    Connection-pooled keep-alive sessions, one per host, shared by every feed and thread
+'''
+
+
+class SessionPool:
+    '''
+        Hands out one requests.Session per (scheme, host). Sessions are safe to share between
+        the fetch engine's threads, so TCP/TLS handshakes are only paid once per connection
+    '''
+    def __init__(self, pool_maxsize: int = POOL_MAXSIZE, pool_block: bool = POOL_BLOCK, keep_alive: bool = KEEP_ALIVE):
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+
+    def _make_session(self) -> requests.Session:
+        session = requests.Session()
+        # each session only talks to one host, so a single connection pool of pool_maxsize is enough
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, pool_block=self.pool_block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+
+    def session(self, url: str) -> requests.Session:
+        '''
+            Get (or make) the session for the host of the url
+        '''
+        parsed = urlparse(url)
+        key = (parsed.scheme, parsed.netloc.lower())
+        with self._lock:
+            if key not in self._sessions:
+                self._sessions[key] = self._make_session()
+            return self._sessions[key]
+
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        '''
+            GET through the host's session (with REQUEST_TIMEOUT unless given), recording latency (to the
+            response headers), bytes and errors. Streamed bodies aren't read here, whoever reads them counts their bytes
+
+            Raises Throttled for 429/502/503/504 responses, so the fetch engine can back off and retry
+        '''
+        kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+        metrics = get_metrics()
+        start = time.perf_counter()
+        try:
+            response = self.session(url).get(url, **kwargs)
+        except requests.Timeout:
+            metrics.error(url, timeout=True)
+            raise
+        except requests.RequestException:
+            metrics.error(url)
+            raise
+        metrics.observe(url, time.perf_counter() - start)
+        if response.status_code >= 400:
+            metrics.error(url)
+        if response.status_code in RETRY_STATUSES:
+            response.close()
+            raise Throttled(
+                f'{response.status_code} from {urlparse(url).netloc}', response=response,
+                retry_after=parse_retry_after(response.headers.get('Retry-After')),
+            )
+        if not kwargs.get('stream'):
+            metrics.add_bytes(url, len(response.content))
+        return response
+
+
+    def close(self):
+        '''
+            Close every pooled connection
+        '''
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+# one pool shared by every feed
+_sessions = None
+
+def get_sessions() -> SessionPool:
+    global _sessions
+    if _sessions is None:
+        _sessions = SessionPool()
+    return _sessions
@@ -0,0 +1,73 @@
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, urlparse, urljoin
+
+'''
+    URL helpers: resolving feed links, and canonicalization so the same article found
+    through different feeds is only fetched once
+'''
+
+# query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'cmp', 'ref', 'ref_src',
+    'ito', 'taid', 'ncid', 'rss', 'sr_share', '__vfz', 'cid', 'intcmp',
+}
+TRACKING_PREFIXES = ('utm_', 'at_', 'pk_')
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonical_url(url: str) -> str:
+    '''
+        Normalize a url: https, lowercase host without www./default port, no fragment,
+        no tracking parameters, sorted query and no trailing slash
+    '''
+    parts = urlsplit(url.strip())
+    if parts.scheme not in ('http', 'https', ''):
+        return url.strip()
+
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f'{host}:{parts.port}'
+
+    path = parts.path.rstrip('/') or '/'
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not is_tracking_param(k))
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+
+def entry_link(entry) -> str:
+    '''
+        The article link of a feedparser entry. Falls back to the GUID/id, but only if that is a web address
+    '''
+    link = entry.get('link')
+    if link:
+        return link
+    for key in ('id', 'guid'):
+        guid = entry.get(key)
+        if guid and (guid.startswith(('http://', 'https://')) or entry.get('guidislink')):
+            return guid
+    return None
+
+
+def outlet_name(base_url: str) -> str:
+    '''
+        Short name of a news outlet: its host without www.
+    '''
+    host = (urlsplit(base_url).hostname or base_url).lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def resolve_url(base_url: str, url: str) -> str:
+    '''
+        Turn paths and scheme-less links into full urls
+    '''
+    parsed = urlparse(url)
+
+    if not parsed.netloc: # path, not url
+        url = urljoin(base_url, url)
+    elif not parsed.scheme: # scheme-relative (//host/path)
+        url = f"https:{url}"
+    return url
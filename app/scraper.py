@@ -0,0 +1,162 @@
+import sys
+import os
+import time
+import logging
+import asyncio
+from feeds.webfeeds import WebFeed
+from feeds.jswebfeeds import RCMPWebFeed
+from feeds.crawl import Crawl
+from feeds.profiles import Profile
+from feeds.parsing import close_parse_pool
+from net.engine import get_engine, gave_up
+from net.sessions import get_sessions
+from net.browser import get_browser
+from storage.crawlstate import CrawlState
+from storage.httpcache import HttpCache
+from storage.runlog import RunLog
+from storage.textstore import TextStore
+from metrics import get_metrics
+from settings import INCREMENTAL, HTTP_CACHE, TEXT_STORE, RESULT_QUEUE_SIZE, WINDOW, RUN_BUDGET, FEED_BUDGET
+
+'''
+    The feeds and the crawl itself, shared by the GUI (main.py, gui/worker.py) and headless mode (cli.py)
+'''
+
+if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
+    # Running inside a PyInstaller bundle
+    browser_path = os.path.join(sys._MEIPASS, 'ms-playwright')
+else:
+    # Running in a regular Python environment
+    browser_path = os.path.join(os.path.expanduser("~"), "AppData", "Local", "ms-playwright")
+
+# Set the Playwright environment variable for browser path
+os.environ['PLAYWRIGHT_BROWSERS_PATH'] = browser_path
+
+# Making all webfeeds into a variable
+webfeeds = [
+    WebFeed(base_url="https://www.canada.ca", path="/en/news/web-feeds.html"),
+    WebFeed(base_url="https://www.cbc.ca", path="/rss/"),
+    WebFeed(base_url="https://globalnews.ca", path="/pages/feeds/"),
+    WebFeed(base_url="https://www.thestar.com", path="/site/static-pages/rss-feeds.html"),
+]
+js_webfeeds = [
+    RCMPWebFeed(),    
+]
+
+async def stream_webfeeds(crawl: Crawl, feeds: list = None, budget: float = RUN_BUDGET, feed_budget: float = FEED_BUDGET):
+    '''
+        Runs every webfeed (JS and non-JS, or just the feeds given) at once through the shared fetch engine
+        Yields dictionaries with info such as title of article, link, as soon as any feed confirms one
+
+        budget (seconds) bounds the whole run and feed_budget each feed (None for no limit). Feeds still
+        going when their time is up are cancelled, and the articles already confirmed are still yielded.
+        How each feed ended is recorded on the crawl (see Crawl.feed_done)
+    '''
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget if budget else None
+    queue = asyncio.Queue(maxsize=RESULT_QUEUE_SIZE)
+    metrics = get_metrics()
+    
+    async def drain(feed):
+        name = f'{feed.base_url}{feed.path}'
+        start = time.perf_counter()
+        results = 0
+        status = 'finished'
+        failures = []
+        gave_up.set(failures) # only this feed's task (and the ones it starts) add to it
+        try:
+            async with asyncio.timeout(feed_budget):
+                async for article in feed.iter_webfeed(crawl):
+                    await queue.put(article)
+                    results += 1
+            if failures:
+                logging.warning(f'{name}: gave up on {len(failures)} requests. Some articles were not evaluated')
+                status = 'partial'
+        except TimeoutError:
+            logging.warning(f'{name} ran out of its {feed_budget}s budget. Keeping the {results} articles found')
+            status = 'cut off'
+        except asyncio.CancelledError:
+            status = 'cut off' # the run's budget ran out (or the consumer stopped)
+            raise
+        except Exception as e:
+            logging.error(f'Error processing {name}: {e}')
+            status = 'failed'
+        finally:
+            crawl.feed_done(name, status, results, time.perf_counter() - start, len(failures))
+            metrics.feed_done(name, crawl.outcomes[name])
+        await queue.put(None) # this feed is done
+    
+    feeds = webfeeds + js_webfeeds if feeds is None else feeds
+    tasks = [asyncio.create_task(drain(feed)) for feed in feeds]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            try:
+                article = await asyncio.wait_for(queue.get(), deadline - loop.time() if deadline else None)
+            except TimeoutError:
+                logging.warning(f'Run budget of {budget}s used up. Stopping {remaining} feeds')
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                # articles confirmed before the cut off are still reported
+                while not queue.empty():
+                    if (article := queue.get_nowait()) is not None:
+                        yield article
+                break
+            if article is None:
+                remaining -= 1
+            else:
+                yield article
+    finally:
+        for task in tasks:
+            task.cancel()
+        # let the cancelled feeds record how they ended
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def new_crawl(profiles: list[Profile], incremental: bool = INCREMENTAL, window: str = WINDOW, store: bool = TEXT_STORE) -> Crawl:
+    '''
+        One crawl for every profile given: the feeds share the same matchers, HTTP cache (and crawl state, if incremental),
+        published-date window (see feeds/crawl.py window_start) and article text store (if store)
+    '''
+    state = CrawlState() if incremental else None
+    cache = HttpCache() if HTTP_CACHE else None
+    texts = TextStore() if store else None
+    try:
+        return Crawl(profiles=profiles, state=state, cache=cache, window=window, runs=RunLog(), texts=texts)
+    except Exception:
+        # e.g. a window that can't be read: don't leave the storage already opened behind
+        for storage in (state, cache, texts):
+            if storage:
+                storage.close()
+        raise
+
+
+def close_storage(crawl: Crawl):
+    '''
+        Close the crawl state/cache/text store (the shared engine, sessions and browser stay up for another crawl)
+    '''
+    if crawl.state:
+        crawl.state.close()
+    if crawl.cache:
+        crawl.cache.close()
+    if crawl.texts:
+        crawl.texts.close()
+
+
+async def close_crawl(crawl: Crawl):
+    '''
+        Close the crawl state/cache/text store and the shared engine, sessions, browser and parse pool
+    '''
+    close_storage(crawl)
+    await close_shared()
+
+
+async def close_shared():
+    '''
+        Close the shared engine, sessions, browser and parse pool
+    '''
+    get_engine().close()
+    get_sessions().close()
+    await get_browser().close()
+    close_parse_pool()
@@ -1,6 +1,5 @@
 import os
 import logging
-import pandas as pd
 
 '''
     Settings, Constants used throughout the code
@@ -10,10 +9,73 @@ import pandas as pd
 DEBUG = False
 MAX_THREADS = os.cpu_count()
 
+# Keyword matching
+WHOLE_WORD = False # only match keywords that aren't part of a longer word
+
+# Article body scanning
+ARTICLE_MAX_BYTES = 1_000_000 # stop reading an article after this many bytes
+ARTICLE_CHUNK_SIZE = 16_384 # bytes read (and scanned) at a time
+
+# Incremental crawling (remember evaluated articles between runs)
+INCREMENTAL = False # if True, only articles not seen in earlier runs are fetched and evaluated
+STATE_PATH = "cache/crawl_state.sqlite3"
+STATE_RETENTION_DAYS = 14 # forget articles checked longer ago than this
+STATE_MAX_ROWS = 200_000 # oldest rows are dropped past this
+
+# Conditional GET cache for feed index pages and RSS/ATOM documents
+HTTP_CACHE = True
+HTTP_CACHE_PATH = "cache/http_cache.sqlite3"
+FEED_LIST_TTL = 6 * 60 * 60 # seconds a feed index page's list of feeds is reused without asking
+
+# Article text store (the text of every article fetched, to re-query offline with new keywords)
+TEXT_STORE = False # if True, articles are read in full (up to ARTICLE_MAX_BYTES) so their whole text can be kept
+TEXT_STORE_PATH = "cache/text_store.sqlite3"
+TEXT_STORE_MAX_BYTES = 200_000_000 # compressed text kept, least recently used articles are dropped past this
+
+# Published-date window (feed entries published before it are dropped before any article is fetched)
+WINDOW = None # None for no window, "24h", "90m", "7d", "2w", an ISO date/time, or "last-run" (since the last successful run)
+RUN_LOG_PATH = "cache/runs.json" # start time of each profile's last successful run
+
+# Time budgets (feeds still going when their time is up are cancelled, the articles already found are kept)
+RUN_BUDGET = None # seconds for the whole run (one daemon cycle), None for no limit
+FEED_BUDGET = None # seconds for each feed, None for no limit
+
+# Fetch engine limits (shared by every feed in a run)
+MAX_IN_FLIGHT = MAX_THREADS * 4 # total requests in flight at once
+MAX_PER_HOST = 8 # requests in flight to a single host
+
+# Per-host flow control (adaptive limit, retries, circuit breaker)
+REQUEST_TIMEOUT = (5, 10) # seconds to connect, seconds between bytes of the response
+START_PER_HOST = 4 # requests in flight to a host at first, adapts between 1 and MAX_PER_HOST
+TARGET_LATENCY = 2.0 # hosts slower than this (per request, moving average) get fewer requests at once
+MAX_RETRIES = 3 # after timeouts, connection errors and 429/502/503/504
+RETRY_BACKOFF = 0.5 # seconds before the first retry, doubled each time (with full jitter)
+RETRY_BACKOFF_MAX = 30 # longest wait between retries (Retry-After included)
+BREAKER_FAILURES = 5 # failures in a row before a host's requests are turned away
+BREAKER_COOLDOWN = 60 # seconds before one trial request is let through again
+
+# Pipelining (feeds are parsed and their articles scanned as soon as they arrive)
+FEED_PIPELINE_DEPTH = MAX_PER_HOST # raw feed documents held in memory per outlet at once
+RESULT_QUEUE_SIZE = 100 # confirmed articles waiting to be consumed before the crawl waits
+
+# Parsing (feedparser/BeautifulSoup)
+PARSE_PROCESSES = 0 # worker processes for parsing, 0 = parse on threads in this process
+
+# HTTP session pool (one keep-alive session per host)
+POOL_MAXSIZE = MAX_PER_HOST # connections kept open per host
+POOL_BLOCK = False # if True, wait for a free connection instead of opening a throwaway one
+KEEP_ALIVE = True # reuse connections between requests
+
+# Shared Chromium (one browser per run)
+BROWSER_PAGES = 4 # contexts/pages open at once
+
+# Instrumentation (stage timings, per-host latency, bytes, errors)
+METRICS_PATH = "output/metrics.json" # JSON report written at the end of a run
+METRICS_SNAPSHOT_SECONDS = 30 # daemon mode: how often the live snapshot is rewritten
+
+# Result sinks (results are written to disk as they are confirmed)
+SINK_BATCH_ROWS = 20 # rows buffered before they are flushed to disk
+SINK_FLUSH_SECONDS = 2.0 # or once this long has passed since the last flush
+
 # Debug config
 logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO, format="%(levelname)s: %(message)s")
-
-# Pandas config
-pd.set_option("display.max_columns", None)  # Ensure all columns are visible
-pd.set_option("display.max_colwidth", None) # Preventing truncuation
-pd.set_option("display.width", 200) # Increase console width
@@ -0,0 +1,183 @@
+import os
+import csv
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from settings import SINK_BATCH_ROWS, SINK_FLUSH_SECONDS
+
+'''
+    Result sinks: append result rows to disk as soon as articles are confirmed, so an interrupted
+    run keeps what it found and other programs can tail the output while the crawl is running
+'''
+
+FIELDS = ['Profile', 'Title', 'Link', 'Outlet', 'Published', 'Keywords', 'Latency']
+
+
+class ResultSink:
+    '''
+        Buffers rows and flushes them in batches (every SINK_BATCH_ROWS rows or SINK_FLUSH_SECONDS).
+        Subclasses only write a batch. Rows are dicts (see Crawl.result), only the keys in fields are kept
+    '''
+    extension = ''
+
+    def __init__(self, path: str, fields: list[str] = FIELDS, append: bool = False,
+                 batch_rows: int = SINK_BATCH_ROWS, flush_seconds: float = SINK_FLUSH_SECONDS):
+        self.path = path
+        self.fields = fields
+        self.append = append
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.rows = 0
+        self._pending = []
+        self._last_flush = time.monotonic()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+    def write(self, row: dict):
+        self._pending.append({field: row.get(field) for field in self.fields})
+        self.rows += 1
+        if len(self._pending) >= self.batch_rows or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+
+    def flush(self):
+        if self._pending:
+            self._write_batch(self._pending)
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+
+    def _write_batch(self, rows: list[dict]):
+        raise NotImplementedError
+
+
+    def _close(self):
+        pass
+
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvSink(ResultSink):
+    '''
+        CSV with a header row (only written to new files when appending). Keywords are joined with "; "
+    '''
+    extension = '.csv'
+
+    def __init__(self, path: str, *args, **kwargs):
+        super().__init__(path, *args, **kwargs)
+        new_file = not self.append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a' if self.append else 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fields)
+        if new_file:
+            self._writer.writeheader()
+            self._file.flush()
+
+
+    def _write_batch(self, rows: list[dict]):
+        for row in rows:
+            if isinstance(row.get('Keywords'), list):
+                row['Keywords'] = '; '.join(row['Keywords'])
+            self._writer.writerow(row)
+        self._file.flush()
+
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonlSink(ResultSink):
+    '''
+        One JSON object per line
+    '''
+    extension = '.jsonl'
+
+    def __init__(self, path: str, *args, **kwargs):
+        super().__init__(path, *args, **kwargs)
+        self._file = open(path, 'a' if self.append else 'w', encoding='utf-8')
+
+
+    def _write_batch(self, rows: list[dict]):
+        self._file.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        self._file.flush()
+
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetSink(ResultSink):
+    '''
+        Columnar output, one row group per batch. Needs pyarrow (optional).
+        The file is only readable once closed, and can't be appended to
+    '''
+    extension = '.parquet'
+
+    def __init__(self, path: str, *args, **kwargs):
+        super().__init__(path, *args, **kwargs)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('Parquet output needs pyarrow (pip install pyarrow)') from None
+        if self.append and os.path.exists(path):
+            raise ValueError(f'Parquet files can\'t be appended to: {path}')
+
+        types = {'Keywords': pa.list_(pa.string()), 'Latency': pa.float64()}
+        self._pa = pa
+        self._schema = pa.schema([(field, types.get(field, pa.string())) for field in self.fields])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+
+    def _write_batch(self, rows: list[dict]):
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self._schema))
+
+
+    def _close(self):
+        self._writer.close()
+
+
+SINKS = {sink.extension: sink for sink in (CsvSink, JsonlSink, ParquetSink)}
+
+
+@asynccontextmanager
+async def flushing(sinks: list[ResultSink], seconds: float = SINK_FLUSH_SECONDS):
+    '''
+        Flush the sinks every few seconds while the block runs. write() only checks SINK_FLUSH_SECONDS
+        when a row comes in, so without this the last rows before a quiet spell would wait for the next one
+    '''
+    async def tick():
+        while True:
+            await asyncio.sleep(seconds)
+            for sink in sinks:
+                sink.flush()
+
+    task = asyncio.create_task(tick())
+    try:
+        yield
+    finally:
+        task.cancel()
+
+
+def open_sink(path: str, fields: list[str] = FIELDS, append: bool = False) -> ResultSink:
+    '''
+        Open the sink matching the file extension (.csv, .jsonl or .parquet)
+    '''
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SINKS:
+        raise ValueError(f'Unknown output format {extension!r}, expected one of {", ".join(SINKS)}')
+    return SINKS[extension](path, fields, append)
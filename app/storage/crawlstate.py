@@ -0,0 +1,89 @@
+import os
+import time
+import sqlite3
+import logging
+from settings import STATE_PATH, STATE_RETENTION_DAYS, STATE_MAX_ROWS
+
+'''
+    On-disk record of the articles already evaluated, so repeat runs only process new ones
+'''
+
+
+class CrawlState:
+    '''
+        SQLite table of (link, profile) -> content hash, match outcome and when it was checked.
+        The profile is a fingerprint of the keywords used, so changing keywords re-evaluates articles
+    '''
+    def __init__(self, path: str = STATE_PATH, retention_days: float = STATE_RETENTION_DAYS, max_rows: int = STATE_MAX_ROWS):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS articles (
+                link TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                content_hash TEXT,
+                matched INTEGER NOT NULL,
+                checked_at REAL NOT NULL,
+                PRIMARY KEY (link, profile)
+            )
+        ''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS articles_checked_at ON articles (checked_at)')
+        self.db.commit()
+
+
+    def unseen(self, links: list[str], profile: str) -> list[str]:
+        '''
+            Returns the links (in order) that haven't been evaluated for this profile yet
+        '''
+        if not links:
+            return []
+        seen = set()
+        unique = list(dict.fromkeys(links))
+        for i in range(0, len(unique), 500): # stay under SQLite's variable limit
+            batch = unique[i:i + 500]
+            rows = self.db.execute(
+                f"SELECT link FROM articles WHERE profile = ? AND link IN ({','.join('?' * len(batch))})",
+                [profile, *batch],
+            )
+            seen.update(row[0] for row in rows)
+        return [link for link in links if link not in seen]
+
+
+    def record(self, link: str, profile: str, content_hash: str, matched: bool):
+        '''
+            Remember that the link was evaluated (errors shouldn't be recorded, so they're retried next run)
+        '''
+        self.db.execute(
+            'INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?)',
+            (link, profile, content_hash, int(matched), time.time()),
+        )
+        self.db.commit()
+
+
+    def evict(self):
+        '''
+            Drop rows older than retention_days, then the oldest rows past max_rows
+        '''
+        cutoff = time.time() - self.retention_days * 86400
+        expired = self.db.execute('DELETE FROM articles WHERE checked_at < ?', (cutoff,)).rowcount
+        overflow = self.db.execute('''
+            DELETE FROM articles WHERE rowid IN (
+                SELECT rowid FROM articles ORDER BY checked_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_rows,)).rowcount
+        self.db.commit()
+        if expired or overflow:
+            logging.debug(f'Crawl state: evicted {expired} expired and {overflow} overflow rows')
+
+
+    def close(self):
+        self.evict()
+        self.db.close()
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+from settings import HTTP_CACHE_PATH, FEED_LIST_TTL
+
+'''
+    Conditional GET cache for feed index pages and RSS/ATOM documents
+'''
+
+
+class HttpCache:
+    '''
+        Keeps the ETag/Last-Modified of feed documents so later runs can send If-None-Match /
+        If-Modified-Since, plus the feed lists found on each index page (reused for FEED_LIST_TTL seconds)
+
+        Validators are stored under a namespace. A 304 only means "skip" if the earlier copy was
+        evaluated with the same keywords and window, so RSS documents use the crawl's feed_namespace
+    '''
+    def __init__(self, path: str = HTTP_CACHE_PATH, feed_list_ttl: float = FEED_LIST_TTL):
+        self.path = path
+        self.feed_list_ttl = feed_list_ttl
+        self.hits = 0 # served from cache without a request
+        self.misses = 0 # full download
+        self.not_modified = 0 # 304 responses
+        self.bytes_saved = 0 # size of the copies the 304s stood in for
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS validators (
+                url TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (url, namespace)
+            )
+        ''')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS feed_lists (
+                url TEXT PRIMARY KEY,
+                links TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            )
+        ''')
+        self.db.commit()
+
+
+    def request_headers(self, url: str, namespace: str = '') -> dict:
+        '''
+            Conditional request headers for the url (empty if nothing is cached)
+        '''
+        row = self.db.execute(
+            'SELECT etag, last_modified FROM validators WHERE url = ? AND namespace = ?', (url, namespace)
+        ).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers['If-None-Match'] = row[0]
+        if row and row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+
+    def store(self, url: str, validators: dict, size: int, namespace: str = ''):
+        '''
+            Save the ETag/Last-Modified of a full (200) response
+        '''
+        if not validators.get('ETag') and not validators.get('Last-Modified'):
+            return
+        self.db.execute(
+            'INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?, ?, ?)',
+            (url, namespace, validators.get('ETag'), validators.get('Last-Modified'), size, time.time()),
+        )
+        self.db.commit()
+
+
+    def record_not_modified(self, url: str, namespace: str = ''):
+        row = self.db.execute(
+            'SELECT size FROM validators WHERE url = ? AND namespace = ?', (url, namespace)
+        ).fetchone()
+        self.not_modified += 1
+        self.bytes_saved += row[0] if row else 0
+
+
+    def get_feed_list(self, url: str, fresh: bool = True) -> set[str]:
+        '''
+            Feed links found on the index page, or None if there are none (or, with fresh=True, they're past the TTL)
+        '''
+        row = self.db.execute('SELECT links, stored_at FROM feed_lists WHERE url = ?', (url,)).fetchone()
+        if not row or (fresh and time.time() - row[1] > self.feed_list_ttl):
+            return None
+        return set(json.loads(row[0])) or None # an empty list (from an older version) is as good as none
+
+
+    def put_feed_list(self, url: str, links: set[str]):
+        '''
+            Save the feed links found on an index page. An empty list isn't saved: it's more likely a bad page
+            than an outlet with no feeds, and caching it would skip the outlet for the whole TTL
+        '''
+        if not links:
+            return
+        self.db.execute(
+            'INSERT OR REPLACE INTO feed_lists VALUES (?, ?, ?)', (url, json.dumps(sorted(links)), time.time())
+        )
+        self.db.commit()
+
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'bytes_saved': self.bytes_saved,
+        }
+
+
+    def close(self):
+        logging.info(f'HTTP cache: {self.stats()}')
+        self.db.close()
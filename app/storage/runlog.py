@@ -0,0 +1,46 @@
+import os
+import json
+import logging
+from settings import RUN_LOG_PATH
+
+'''
+    When the last successful run started, per keyword profile (for the "last-run" published-date window)
+'''
+
+
+class RunLog:
+    '''
+        Small JSON file of profile fingerprint -> start time (UNIX seconds) of its last run that
+        finished without errors. The start time is kept (not the end) so nothing published while
+        that run was going falls through the gap
+    '''
+    def __init__(self, path: str = RUN_LOG_PATH):
+        self.path = path
+        self.runs = {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.runs = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f'Could not read the run log {path}: {e}. Starting a new one')
+
+
+    def last_success(self, profile: str) -> float:
+        '''
+            Start time of the profile's last successful run, None if there wasn't one
+        '''
+        return self.runs.get(profile)
+
+
+    def record(self, profile: str, started: float):
+        '''
+            Remember a successful run. The file is replaced in one step, so an interrupted write can't corrupt it
+        '''
+        self.runs[profile] = max(started, self.runs.get(profile, 0))
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.runs, f, indent=2)
+        os.replace(tmp, self.path)
@@ -0,0 +1,142 @@
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+from settings import TEXT_STORE_PATH, TEXT_STORE_MAX_BYTES
+
+'''
+    Compressed on-disk store of the text of every article fetched, so new keywords can be run
+    against it without going back to the sites (offline re-query)
+'''
+
+
+class TextStore:
+    '''
+        SQLite tables of canonical link -> title, summary (feed description or listing text), outlet,
+        published and a text hash, and text hash -> zlib compressed body text. Texts are content
+        addressed, so the same article under several links is kept once
+
+        Past max_bytes (compressed), the least recently used articles are dropped
+    '''
+    def __init__(self, path: str = TEXT_STORE_PATH, max_bytes: int = TEXT_STORE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS articles (
+                link TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                title TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                outlet TEXT,
+                published TEXT,
+                text_hash TEXT NOT NULL,
+                used_at REAL NOT NULL
+            )
+        ''')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS texts (
+                text_hash TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL
+            )
+        ''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS articles_used_at ON articles (used_at)')
+        self.db.commit()
+        self.size = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM texts').fetchone()[0]
+
+
+    def put(self, link: str, url: str, title: str, summary: str, outlet: str, published: str, text: str):
+        '''
+            Keep an article's text under its canonical link (url is the link as found)
+        '''
+        text_hash = hashlib.sha1(text.encode()).hexdigest()
+        if not self.db.execute('SELECT 1 FROM texts WHERE text_hash = ?', (text_hash,)).fetchone():
+            data = zlib.compress(text.encode(), 6)
+            self.db.execute('INSERT INTO texts VALUES (?, ?, ?)', (text_hash, data, len(data)))
+            self.size += len(data)
+        self.db.execute(
+            'INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (link, url, title, summary, outlet, published, text_hash, time.time()),
+        )
+        self.db.commit()
+        if self.size > self.max_bytes:
+            self.evict()
+
+
+    def articles(self):
+        '''
+            Every stored article, as dicts of url, title, summary, outlet, published (ISO 8601, or None) and text.
+            They all count as used, for the LRU
+        '''
+        links = []
+        rows = self.db.execute('''
+            SELECT a.link, a.url, a.title, a.summary, a.outlet, a.published, t.data
+            FROM articles a JOIN texts t ON t.text_hash = a.text_hash
+        ''')
+        try:
+            for link, *row in rows:
+                links.append(link)
+                yield self._article(row)
+        finally:
+            rows.close()
+            self.touch(links)
+
+
+    def _article(self, row) -> dict:
+        url, title, summary, outlet, published, data = row
+        return {
+            'url': url, 'title': title, 'summary': summary, 'outlet': outlet, 'published': published,
+            'text': zlib.decompress(data).decode(),
+        }
+
+
+    def touch(self, links: list[str]):
+        now = time.time()
+        self.db.executemany('UPDATE articles SET used_at = ? WHERE link = ?', ((now, link) for link in links))
+        self.db.commit()
+
+
+    def evict(self):
+        '''
+            Drop the least recently used articles (and texts no article points to) until the store fits max_bytes
+        '''
+        dropped = 0
+        while self.size > self.max_bytes:
+            # just enough of the oldest to cover the excess (a text another article shares isn't freed: go round again)
+            links, freed = [], 0
+            rows = self.db.execute('''
+                SELECT a.link, t.size FROM articles a JOIN texts t ON t.text_hash = a.text_hash ORDER BY a.used_at
+            ''')
+            for link, size in rows:
+                links.append(link)
+                freed += size
+                if freed >= self.size - self.max_bytes:
+                    break
+            rows.close()
+            if not links:
+                break
+            self.db.executemany('DELETE FROM articles WHERE link = ?', ((link,) for link in links))
+            self.db.execute('DELETE FROM texts WHERE text_hash NOT IN (SELECT text_hash FROM articles)')
+            self.size = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM texts').fetchone()[0]
+            dropped += len(links)
+        self.db.commit()
+        if dropped:
+            logging.debug(f'Text store: evicted {dropped} least recently used articles')
+
+
+    def stats(self) -> dict:
+        count = self.db.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+        return {'articles': count, 'bytes': self.size}
+
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+BENCH = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(BENCH, '..', 'app')
+sys.path.insert(0, BENCH)
+sys.path.insert(0, APP)
+
+from fixtures import TITLE_WORDS, BODY_WORDS, generate, load_outlets
+from replay import Replay, ReplayConfig
+
+'''
+    Offline crawl benchmark: every feed type against the local replay server (bench/replay.py), for several
+    engine concurrency settings. Each run is a fresh process, so peak RSS and CPU belong to that run alone
+
+    Run from the repo root:
+        python bench/bench_crawl.py                                   synthetic fixtures, default settings
+        python bench/bench_crawl.py --settings 4x2,16x4,64x8 --latency 0.2 --error-rate 0.05
+        python bench/bench_crawl.py --fixtures recorded/ --js         recorded fixtures, RCMP too (needs PlayWright)
+'''
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return None # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024 # bytes on macOS, KB elsewhere
+
+
+async def crawl_once(job: dict) -> dict:
+    '''
+        Worker side: crawl the local outlets once with the given limits and report what happened
+    '''
+    from net.engine import FetchEngine
+    from net.sessions import SessionPool
+    from feeds.webfeeds import WebFeed
+    from feeds.jswebfeeds import RCMPWebFeed
+    from feeds.crawl import Crawl
+    from feeds.profiles import Profile
+    from feeds.parsing import close_parse_pool
+    from net.browser import get_browser
+    from metrics import get_metrics
+    from scraper import stream_webfeeds
+
+    engine = FetchEngine(job['max_in_flight'], job['max_per_host'])
+    sessions = SessionPool(pool_maxsize=job['max_per_host'])
+    feeds = []
+    for outlet in job['outlets']:
+        if outlet['type'] == 'rss':
+            feeds.append(WebFeed(base_url=outlet['local_url'], path=outlet['path'], engine=engine, sessions=sessions))
+        elif job['js']:
+            feeds.append(RCMPWebFeed(base_url=outlet['local_url'], path=outlet['path'], engine=engine, sessions=sessions))
+
+    crawl = Crawl([Profile('bench', TITLE_WORDS, BODY_WORDS)])
+    metrics = get_metrics()
+    metrics.reset()
+    start = time.perf_counter()
+    first = None
+    results = 0
+    try:
+        async for _ in stream_webfeeds(crawl, feeds):
+            if first is None:
+                first = time.perf_counter() - start
+            results += 1
+    finally:
+        engine.close()
+        sessions.close()
+        await get_browser().close()
+        close_parse_pool()
+    elapsed = time.perf_counter() - start
+
+    report = metrics.report()
+    articles = report['stages'].get('article_fetch', {}).get('calls', 0)
+    return {
+        'setting': f'{job["max_in_flight"]}x{job["max_per_host"]}',
+        'elapsed': elapsed,
+        'first_result': first,
+        'results': results,
+        'articles': articles,
+        'articles_per_s': articles / elapsed if elapsed else 0,
+        'requests_per_s': report['totals']['requests'] / elapsed if elapsed else 0,
+        'mb': report['totals']['bytes'] / (1024 * 1024),
+        'peak_rss_mb': peak_rss_mb(),
+        'cpu': report['cpu'],
+        'errors': report['totals']['errors'],
+        'timeouts': report['totals']['timeouts'],
+        'peak_in_flight': report['totals']['peak_in_flight'],
+        'stages': report['stages'],
+    }
+
+
+def run_worker(job: dict) -> dict:
+    '''
+        Run one crawl in a fresh interpreter. Its report is the last line it prints
+    '''
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', json.dumps(job)],
+        cwd=APP, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'Worker failed:\n{result.stderr[-2000:]}')
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def print_results(results: list[dict]):
+    print(f'{"setting":>8} {"elapsed":>8} {"first":>7} {"results":>7} {"art/s":>7} {"req/s":>7} '
+          f'{"MB":>6} {"RSS MB":>7} {"CPU s":>6} {"err":>4} {"t/o":>4} {"peak":>5}')
+    for r in results:
+        first = f'{r["first_result"]:.2f}' if r['first_result'] is not None else '-'
+        rss = f'{r["peak_rss_mb"]:.0f}' if r['peak_rss_mb'] is not None else '-'
+        print(f'{r["setting"]:>8} {r["elapsed"]:8.2f} {first:>7} {r["results"]:7} {r["articles_per_s"]:7.1f} '
+              f'{r["requests_per_s"]:7.1f} {r["mb"]:6.1f} {rss:>7} {r["cpu"]:6.2f} {r["errors"]:4} {r["timeouts"]:4} '
+              f'{r["peak_in_flight"]:5}')
+
+    stages = sorted({stage for r in results for stage in r['stages']})
+    print(f'\n{"stage (total s / cpu s)":28}' + ''.join(f'{r["setting"]:>18}' for r in results))
+    for stage in stages:
+        cells = []
+        for r in results:
+            stats = r['stages'].get(stage)
+            if not stats:
+                cells.append(f'{"-":>18}')
+                continue
+            cpu = f'{stats["cpu"]:.2f}' if stats['cpu'] is not None else '-'
+            cells.append(f'{stats["total"]:>11.2f} / {cpu:>4}')
+        print(f'{stage:28}' + ''.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline crawl benchmark against the local replay server')
+    parser.add_argument('--fixtures', help='fixtures folder (default: generate synthetic ones)')
+    parser.add_argument('--settings', default='4x2,16x4,32x8', help='MAX_IN_FLIGHTxMAX_PER_HOST pairs to compare')
+    parser.add_argument('--runs', type=int, default=1, help='runs per setting (the fastest is kept)')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-rate', type=float, default=0.0)
+    parser.add_argument('--js', action='store_true', help='include the RCMP listing (needs PlayWright and Chromium)')
+    parser.add_argument('--json', help='also write the results here')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(crawl_once(json.loads(args.worker)))))
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        fixtures = args.fixtures
+        if not fixtures:
+            print('Generating fixtures...')
+            generate(folder)
+            fixtures = folder
+
+        config = ReplayConfig(args.latency, args.jitter, args.error_rate, args.timeout_rate)
+        with Replay(fixtures, config) as replay:
+            outlets = [{**outlet, 'local_url': replay.local_url(outlet['name'])} for outlet in load_outlets(fixtures)]
+            print(f'{len(outlets)} outlets, latency {args.latency}+{args.jitter}s, '
+                  f'errors {args.error_rate:.0%}, timeouts {args.timeout_rate:.0%}\n')
+
+            results = []
+            for setting in args.settings.split(','):
+                max_in_flight, max_per_host = (int(n) for n in setting.lower().split('x'))
+                job = {'outlets': outlets, 'max_in_flight': max_in_flight, 'max_per_host': max_per_host, 'js': args.js}
+                runs = [run_worker(job) for _ in range(args.runs)]
+                results.append(min(runs, key=lambda r: r['elapsed']))
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
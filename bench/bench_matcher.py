@@ -0,0 +1,64 @@
+import os
+import sys
+import random
+import string
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from feeds.matcher import KeywordMatcher
+
+'''
+    Micro-benchmark: any(word in text for word in words) vs the compiled KeywordMatcher
+
+    Run from the repo root: python bench/bench_matcher.py [keywords] [text_kb]
+'''
+
+
+def random_word(rng: random.Random) -> str:
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+
+
+def main():
+    n_words = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    text_kb = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    rng = random.Random(0)
+    keywords = [random_word(rng) for _ in range(n_words)]
+    vocab = [random_word(rng) for _ in range(5000)]
+    text = ''
+    while len(text) < text_kb * 1024:
+        text += ' '.join(rng.choices(vocab, k=100)).capitalize() + '. '
+    hit_text = text + ' ' + keywords[-1].upper() # one match at the very end (worst case for early exit)
+
+    matcher = KeywordMatcher(keywords)
+    runs = 50
+
+    def naive_any(t):
+        lowered = t.lower()
+        return any(word.lower() in lowered for word in keywords)
+
+    def naive_all(t):
+        lowered = t.lower()
+        return {word for word in keywords if word.lower() in lowered}
+
+    assert naive_any(hit_text) == matcher.search(hit_text)
+    assert naive_all(hit_text) == matcher.findall(hit_text)
+
+    print(f'{n_words} keywords, {len(text) // 1024} KB text, {runs} runs')
+    compile_time = timeit.timeit(lambda: KeywordMatcher(keywords), number=5) / 5
+    print(f'compile:                 {compile_time * 1000:8.2f} ms (once per run)')
+    for label, fn, t in [
+        ('any() no match', naive_any, text),
+        ('matcher.search no match', matcher.search, text),
+        ('any() match at end', naive_any, hit_text),
+        ('matcher.search at end', matcher.search, hit_text),
+        ('set of matches (naive)', naive_all, hit_text),
+        ('matcher.findall', matcher.findall, hit_text),
+    ]:
+        elapsed = timeit.timeit(lambda: fn(t), number=runs) / runs
+        print(f'{label:24} {elapsed * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import ssl
+import time
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+import requests
+from net.sessions import SessionPool
+
+'''
+    Benchmark: module-level requests.get vs pooled keep-alive sessions against a local HTTPS server
+
+    Run from the repo root: python bench/bench_sessions.py [requests] [threads]
+    Needs the openssl binary to make a throwaway self-signed certificate
+'''
+
+BODY = b'<html><body>' + b'x' * 4096 + b'</body></html>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # keep-alive needs HTTP/1.1 + content-length
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_cert(folder: str) -> tuple[str, str]:
+    '''
+        Make a self-signed certificate for localhost. Returns (certfile, keyfile)
+    '''
+    cert, key = os.path.join(folder, 'cert.pem'), os.path.join(folder, 'key.pem')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-keyout', key, '-out', cert, '-subj', '/CN=localhost',
+        '-addext', 'subjectAltName=DNS:localhost,IP:127.0.0.1',
+    ], check=True, capture_output=True)
+    return cert, key
+
+
+def start_server(cert: str, key: str) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(get, url: str, total: int, threads: int) -> float:
+    '''
+        Do total GETs over the given amount of threads. Returns requests per second
+    '''
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for response in executor.map(lambda _: get(url), range(total)):
+            response.raise_for_status()
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    with tempfile.TemporaryDirectory() as folder:
+        cert, key = make_cert(folder)
+        server = start_server(cert, key)
+        url = f'https://127.0.0.1:{server.server_address[1]}/article'
+
+        before = run(lambda u: requests.get(u, verify=cert, timeout=5), url, total, threads)
+
+        pool = SessionPool(pool_maxsize=threads)
+        after = run(lambda u: pool.get(u, verify=cert, timeout=5), url, total, threads)
+        pool.close()
+        server.shutdown()
+
+    print(f'{total} requests, {threads} threads')
+    print(f'requests.get (new connection each): {before:8.1f} req/s')
+    print(f'SessionPool (keep-alive):           {after:8.1f} req/s')
+    print(f'speedup: {after / before:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
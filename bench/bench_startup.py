@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+'''
+    Startup benchmark: wall time of fresh interpreters importing each entry point
+
+    Run from the repo root: python bench/bench_startup.py [runs]
+    For a per-module breakdown: cd app && python -X importtime cli.py --help
+'''
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+
+CASES = [
+    ('python (baseline)', ['-c', 'pass']),
+    ('cli.py --help', ['cli.py', '--help']),
+    ('import cli', ['-c', 'import cli']),
+    ('import scraper (crawl path)', ['-c', 'import scraper']),
+    ('import main (GUI)', ['-c', 'import main']),
+    ('import pandas (reference)', ['-c', 'import pandas']),
+]
+
+
+def time_run(args: list[str]) -> float:
+    '''
+        Seconds for one fresh interpreter, or None if it failed (e.g. a package isn't installed)
+    '''
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], cwd=APP, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    elapsed = time.perf_counter() - start
+    return elapsed if result.returncode == 0 else None
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(f'{runs} runs each, median wall time')
+    for label, args in CASES:
+        times = [time_run(args) for _ in range(runs)]
+        if None in times:
+            print(f'{label:30} failed (missing dependency?)')
+            continue
+        print(f'{label:30} {statistics.median(times) * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import random
+import string
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+'''
+    Fixtures for the replay server (bench/replay.py): feed index pages, RSS documents, article pages
+    and the RCMP news listing, laid out as <folder>/<host>/<path>@<query> with an outlets.json describing them
+
+        python bench/fixtures.py generate <folder>     synthetic, deterministic (seeded) fixtures
+        python bench/fixtures.py record <folder>       record the live sites (needs network, and PlayWright for RCMP)
+'''
+
+# keywords the synthetic fixtures are salted with (the benchmark searches for these)
+TITLE_WORDS = ['wildfire', 'flood', 'storm']
+BODY_WORDS = ['evacuation', 'shelter']
+
+LISTING_PAGE_SIZE = 25
+
+# stand-in for the DataTables API the RCMP listing exposes (just what feeds/jswebfeeds.py uses)
+DATATABLES_SHIM = '''<script>
+(function () {
+    const rows = %s;
+    const table = document.querySelector('#news');
+    const tbody = table.querySelector('tbody');
+    const handlers = {};
+    let len = %d, page = 0;
+    const render = () => { tbody.innerHTML = (len < 0 ? rows : rows.slice(page * len, page * len + len)).join(''); };
+    const fire = () => { const callbacks = handlers.draw || []; handlers.draw = []; callbacks.forEach(cb => cb()); };
+    const draw = () => { render(); setTimeout(fire, 0); return api; };
+    const current = () => ({nodes: () => ({toArray: () => Array.from(tbody.querySelectorAll('tr'))})});
+    const api = {
+        one: (event, cb) => { (handlers[event] = handlers[event] || []).push(cb); return api; },
+        page: Object.assign(i => { page = i; return {draw}; }, {
+            len: n => { len = n; page = 0; return {draw}; },
+            info: () => ({pages: len < 0 ? 1 : Math.ceil(rows.length / len), recordsDisplay: rows.length}),
+        }),
+        rows: current,
+    };
+    const jq = () => ({DataTable: () => api});
+    jq.fn = {dataTable: {tables: () => [table]}};
+    window.jQuery = jq;
+})();
+</script>'''
+
+
+def fixture_path(folder: str, url: str) -> str:
+    '''
+        Where the response for a url is kept: <folder>/<host>/<path>@<query>. The @ keeps a page
+        and the folder of pages under it (/en/news and /en/news/...) apart
+    '''
+    parts = urlsplit(url)
+    return os.path.join(folder, parts.netloc.lower(), *parts.path.lstrip('/').split('/')) + f'@{parts.query}'
+
+
+def save(folder: str, url: str, content):
+    path = fixture_path(folder, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content.encode() if isinstance(content, str) else content)
+
+
+def save_outlets(folder: str, outlets: list[dict]):
+    with open(os.path.join(folder, 'outlets.json'), 'w', encoding='utf-8') as f:
+        json.dump(outlets, f, indent=2)
+
+
+def load_outlets(folder: str) -> list[dict]:
+    with open(os.path.join(folder, 'outlets.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def listing_pages(rows: list[str]) -> list[str]:
+    '''
+        The RCMP listing split into pages of plain rows, each with paginate buttons (Next last) for the
+        clicking fallback. The first page also carries every row for the DataTables stand-in
+    '''
+    count = max(1, -(-len(rows) // LISTING_PAGE_SIZE))
+    pages = []
+    for i in range(count):
+        buttons = ''.join(
+            f'<a class="paginate_button" href="/en/news?page={n + 1}">{n + 1}</a>' for n in range(count)
+        )
+        buttons += f'<a class="paginate_button next" href="/en/news?page={min(i + 2, count)}">Next</a>'
+        shown = ''.join(rows[i * LISTING_PAGE_SIZE:(i + 1) * LISTING_PAGE_SIZE])
+        script = DATATABLES_SHIM % (json.dumps(rows), LISTING_PAGE_SIZE) if i == 0 else ''
+        pages.append(
+            f'<html><head><title>News</title></head><body><table id="news"><tbody>{shown}</tbody></table>'
+            f'<div class="dataTables_paginate">{buttons}</div>{script}</body></html>'
+        )
+    return pages
+
+
+def save_listing(folder: str, base_url: str, path: str, rows: list[str]):
+    for i, page in enumerate(listing_pages(rows)):
+        save(folder, f'{base_url}{path}' + (f'?page={i + 1}' if i else ''), page)
+        if i == 0:
+            save(folder, f'{base_url}{path}?page=1', page)
+
+
+def listing_row(published: date, desc: str, link: str, title: str) -> str:
+    return (
+        f'<tr><td>{published.isoformat()}</td><td class="nws-tbl-desc">{desc}</td>'
+        f'<td><a class="h4" href="{link}">{title}</a></td></tr>'
+    )
+
+
+def generate(folder: str, feeds_per_outlet: int = 8, items_per_feed: int = 40, article_kb: int = 40,
+             title_rate: float = 0.3, body_rate: float = 0.5, overlap: float = 0.1, listing_rows: int = 120, seed: int = 0):
+    '''
+        Synthetic fixtures for every outlet in scraper.py. title_rate of the entries have a TITLE_WORD,
+        body_rate of the articles have a BODY_WORD (somewhere random), and overlap of the entries are
+        repeated in another feed of the same outlet (as real outlets do)
+    '''
+    from scraper import webfeeds, js_webfeeds
+
+    rng = random.Random(seed)
+    vocab = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(3000)]
+    now = datetime(2026, 1, 15, 12, tzinfo=timezone.utc)
+
+    def sentence(n: int, word: str = None) -> str:
+        words = rng.choices(vocab, k=n)
+        if word:
+            words[rng.randrange(n)] = word
+        return ' '.join(words).capitalize()
+
+    def article(title: str, heading_class: str = None) -> str:
+        paragraphs = []
+        while sum(map(len, paragraphs)) < article_kb * 1024:
+            paragraphs.append(f'<p>{sentence(60)}.</p>')
+        if rng.random() < body_rate:
+            i = rng.randrange(len(paragraphs))
+            paragraphs[i] = f'<p>{sentence(60, rng.choice(BODY_WORDS))}.</p>'
+        heading = f'<h1 class="{heading_class}">' if heading_class else '<h1>'
+        return (
+            f'<html><head><title>{title}</title><script>var tracking = "{sentence(20)}";</script></head>'
+            f'<body><nav>{sentence(30)}</nav>{heading}{title}</h1>{"".join(paragraphs)}</body></html>'
+        )
+
+    def title() -> str:
+        return sentence(8, rng.choice(TITLE_WORDS) if rng.random() < title_rate else None)
+
+    outlets = []
+    for feed in webfeeds:
+        base_url, host = feed.base_url, urlsplit(feed.base_url).netloc
+        outlets.append({'name': host, 'base_url': base_url, 'path': feed.path, 'type': 'rss'})
+        feed_links = [f'/rss/feed-{i}.xml' for i in range(feeds_per_outlet)]
+        save(folder, f'{base_url}{feed.path}', '<html><body>' + ''.join(
+            f'<a href="{link}">{sentence(3)}</a><a href="/about/{i}">{sentence(2)}</a>' for i, link in enumerate(feed_links)
+        ) + '</body></html>')
+
+        previous = []
+        for i, link in enumerate(feed_links):
+            entries = []
+            for j in range(items_per_feed):
+                if previous and rng.random() < overlap:
+                    entries.append(rng.choice(previous))
+                    continue
+                url = f'{base_url}/news/{i}-{j}-{rng.choice(vocab)}.html'
+                entry = {'title': title(), 'link': url, 'published': now - timedelta(minutes=30 * (i * items_per_feed + j))}
+                save(folder, url, article(entry['title']))
+                entries.append(entry)
+            previous = entries
+            save(folder, f'{base_url}{link}', (
+                f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>{host} {i}</title>'
+                + ''.join(
+                    f'<item><title>{e["title"]}</title><link>{e["link"]}</link><guid>{e["link"]}</guid>'
+                    f'<description>{sentence(25)}</description><pubDate>{format_datetime(e["published"])}</pubDate></item>'
+                    for e in entries
+                ) + '</channel></rss>'
+            ))
+
+    for feed in js_webfeeds:
+        base_url, host = feed.base_url, urlsplit(feed.base_url).netloc
+        outlets.append({'name': host, 'base_url': base_url, 'path': feed.path, 'type': 'rcmp'})
+        rows = []
+        for i in range(listing_rows):
+            published = (now - timedelta(days=i // 4)).date()
+            heading = title()
+            link = f'{feed.path}/{published.year}/{published.month:02}/{i}-{rng.choice(vocab)}'
+            save(folder, f'{base_url}{link}', article(heading, feed.heading_class))
+            rows.append(listing_row(published, heading, link, heading))
+        save_listing(folder, base_url, feed.path, rows)
+
+    save_outlets(folder, outlets)
+    return outlets
+
+
+def record(folder: str, feeds_per_outlet: int = 5, articles_per_feed: int = 10):
+    '''
+        Record the live outlets into the same layout (only as much as the limits allow)
+    '''
+    from scraper import webfeeds, js_webfeeds
+    from feeds.parsing import parse_urls, parse_feed
+    from feeds.matcher import KeywordMatcher
+    from net.ratelimit import RETRYABLE
+
+    def get(fetch, url: str) -> bytes:
+        try:
+            return fetch(url)
+        except RETRYABLE as e:
+            print(f'Could not record {url}: {e}')
+
+    everything = KeywordMatcher([chr(c) for c in range(ord('a'), ord('z') + 1)]) # any title at all
+    outlets = []
+    for feed in webfeeds:
+        page_url = feed.resolve_url(f'{feed.base_url}{feed.path}')
+        content = get(feed.get_request, page_url)
+        if not content:
+            print(f'Could not record {page_url}')
+            continue
+        save(folder, page_url, content)
+        outlets.append({'name': urlsplit(feed.base_url).netloc, 'base_url': feed.base_url, 'path': feed.path, 'type': 'rss'})
+        for url in sorted(parse_urls(content, feed.parser_type))[:feeds_per_outlet]:
+            url = feed.resolve_url(url)
+            document = get(feed.get_request, url)
+            if not document:
+                continue
+            save(folder, url, document)
+            for entry in parse_feed(document, everything, feed.base_url)[:articles_per_feed]:
+                page = get(feed.get_request, entry['link'])
+                if page:
+                    save(folder, entry['link'], page)
+        print(f'Recorded {page_url}')
+
+    for feed in js_webfeeds:
+        try:
+            rows = asyncio.run(feed.get_listing(f'{feed.base_url}{feed.path}'))
+        except Exception as e:
+            print(f'Could not record {feed.base_url}{feed.path}: {e}')
+            continue
+        outlets.append({'name': urlsplit(feed.base_url).netloc, 'base_url': feed.base_url, 'path': feed.path, 'type': 'rcmp'})
+        save_listing(folder, feed.base_url, feed.path, [
+            listing_row(row.published or date.today(), row.desc, row.link, row.desc) for row in rows
+        ])
+        for row in rows[:feeds_per_outlet * articles_per_feed]:
+            page = get(feed.get_http_request, feed.resolve_url(row.link))
+            if page:
+                save(folder, feed.resolve_url(row.link), page)
+        print(f'Recorded {feed.base_url}{feed.path}')
+
+    save_outlets(folder, outlets)
+    return outlets
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3 or sys.argv[1] not in ('generate', 'record'):
+        print('Usage: python bench/fixtures.py generate|record <folder>')
+        sys.exit(1)
+    outlets = (generate if sys.argv[1] == 'generate' else record)(sys.argv[2])
+    print(f'{len(outlets)} outlets in {sys.argv[2]}')
@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+import random
+import hashlib
+import mimetypes
+import threading
+from dataclasses import dataclass
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import fixture_path, load_outlets
+
+'''
+    Local replay of the recorded/generated fixtures (see bench/fixtures.py). Every outlet gets its own
+    server (its own host:port, so per-host limits behave like the real sites), with configurable latency,
+    errors and timeouts. Links to the original sites are rewritten to the local servers on the way out
+
+        python bench/replay.py <fixtures folder> [latency] [error_rate]     serve until Ctrl+C
+'''
+
+
+@dataclass
+class ReplayConfig:
+    latency: float = 0.05 # seconds added to every response
+    jitter: float = 0.05 # plus up to this much at random
+    error_rate: float = 0.0 # fraction of requests answered with a 503
+    timeout_rate: float = 0.0 # fraction of requests that stall for stall seconds (past the client's timeout)
+    stall: float = 6.0
+    seed: int = 0
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # keep-alive, like the real sites
+
+    def do_GET(self):
+        replay = self.server.replay
+        config = replay.config
+        with replay.lock:
+            roll = replay.rng.random()
+            delay = config.latency + replay.rng.random() * config.jitter
+        time.sleep(delay)
+
+        if roll < config.timeout_rate:
+            time.sleep(config.stall)
+        elif roll < config.timeout_rate + config.error_rate:
+            return self.reply(503, b'unavailable', 'text/plain')
+
+        url = f'{self.server.original}{self.path}'
+        path = fixture_path(replay.folder, url)
+        if not os.path.isfile(path) and '?' in self.path:
+            path = fixture_path(replay.folder, url.split('?', 1)[0])
+        if not os.path.isfile(path):
+            return self.reply(404, b'not found', 'text/plain')
+
+        content = replay.read(path)
+        etag = f'"{hashlib.sha1(content).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            return self.reply(304, b'', None, etag)
+        self.reply(200, content, content_type(path, content), etag)
+
+    def reply(self, status: int, body: bytes, content_type: str, etag: str = None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def content_type(path: str, content: bytes) -> str:
+    guessed = mimetypes.guess_type(path.rsplit('@', 1)[0])[0]
+    if guessed:
+        return guessed
+    return 'application/rss+xml' if content.lstrip().startswith(b'<?xml') else 'text/html; charset=utf-8'
+
+
+class Replay:
+    '''
+        One server per outlet in the fixtures folder. Use as a context manager, then point the feeds at local_url
+    '''
+    def __init__(self, folder: str, config: ReplayConfig = None):
+        self.folder = folder
+        self.config = config or ReplayConfig()
+        self.outlets = load_outlets(folder)
+        self.rng = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.servers = {}
+        self._rewrites = []
+        self._cache = {}
+
+
+    def start(self):
+        for outlet in self.outlets:
+            server = ThreadingHTTPServer(('127.0.0.1', 0), ReplayHandler)
+            server.daemon_threads = True
+            server.replay = self
+            server.original = outlet['base_url'].rstrip('/')
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers[outlet['name']] = server
+        # longest first, so https://www.x.ca is replaced before https://x.ca
+        self._rewrites = sorted(
+            ((server.original.encode(), self.local_url(name).encode()) for name, server in self.servers.items()),
+            key=lambda pair: -len(pair[0]),
+        )
+        return self
+
+
+    def local_url(self, name: str) -> str:
+        return f'http://127.0.0.1:{self.servers[name].server_address[1]}'
+
+
+    def read(self, path: str) -> bytes:
+        '''
+            Fixture content with links to the original sites pointing at the local servers (cached)
+        '''
+        if path not in self._cache:
+            with open(path, 'rb') as f:
+                content = f.read()
+            for original, local in self._rewrites:
+                content = content.replace(original, local)
+            with self.lock:
+                self._cache[path] = content
+        return self._cache[path]
+
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python bench/replay.py <fixtures folder> [latency] [error_rate]')
+        sys.exit(1)
+    config = ReplayConfig()
+    if len(sys.argv) > 2:
+        config.latency = float(sys.argv[2])
+    if len(sys.argv) > 3:
+        config.error_rate = float(sys.argv[3])
+    with Replay(sys.argv[1], config) as replay:
+        for outlet in replay.outlets:
+            print(f'{outlet["base_url"]}{outlet["path"]} -> {replay.local_url(outlet["name"])}{outlet["path"]}')
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,135 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from net.browser import BrowserPool
+
+'''
+    BrowserPool against a fake Chromium: pages are bounded, reused, and waiters always get one
+
+        python -m pytest tests
+'''
+
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage(self)
+
+    async def close(self):
+        pass
+
+
+class FakePage:
+    def __init__(self, context: FakeContext):
+        self.context = context
+        self.closed = False
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    async def goto(self, url: str):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = 0
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def new_context(self):
+        self.contexts += 1
+        return FakeContext()
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeChromium:
+    def __init__(self):
+        self.launches = []
+
+    async def launch(self):
+        self.launches.append(FakeBrowser())
+        return self.launches[-1]
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+
+    async def stop(self):
+        pass
+
+
+def fake_pool(size: int) -> BrowserPool:
+    pool = BrowserPool(size)
+    pool._loop = asyncio.get_running_loop()
+    pool._lock = asyncio.Lock()
+    pool._slots = asyncio.Semaphore(size)
+    pool._playwright = FakePlaywright()
+    return pool
+
+
+def test_pages_are_bounded_and_reused():
+    async def run():
+        pool = fake_pool(2)
+        lent = most = 0
+
+        async def borrow():
+            nonlocal lent, most
+            async with pool.page():
+                lent += 1
+                most = max(most, lent)
+                await asyncio.sleep(0.01)
+                lent -= 1
+
+        await asyncio.gather(*(borrow() for _ in range(10)))
+        return most, pool._browser.contexts
+
+    assert asyncio.run(run()) == (2, 2)
+
+
+def test_waiters_get_a_page_after_a_borrower_fails():
+    async def run():
+        pool = fake_pool(1)
+
+        async def fail():
+            async with pool.page():
+                raise RuntimeError('page crashed')
+
+        async def borrow():
+            async with pool.page() as page:
+                return page
+
+        failed, page = await asyncio.wait_for(asyncio.gather(fail(), borrow(), return_exceptions=True), 1)
+        return failed, page
+
+    failed, page = asyncio.run(run())
+    assert isinstance(failed, RuntimeError)
+    assert isinstance(page, FakePage)
+
+
+def test_relaunch_while_a_page_is_lent():
+    async def run():
+        pool = fake_pool(1)
+
+        async def borrow():
+            async with pool.page() as page:
+                return page
+
+        async with pool.page() as old:
+            pool._browser.connected = False # Chromium died
+            waiter = asyncio.create_task(borrow()) # relaunches, then waits for the only slot
+            await asyncio.sleep(0.01)
+        new = await asyncio.wait_for(waiter, 1)
+        return old, new, pool
+
+    old, new, pool = asyncio.run(run())
+    assert new is not old
+    assert len(pool._playwright.chromium.launches) == 2
+    assert old not in pool._idle # pages of the dead browser aren't reused
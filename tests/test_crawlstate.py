@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from storage.crawlstate import CrawlState
+
+'''
+    CrawlState: which articles were already evaluated, per keyword profile, and its eviction
+
+        python -m pytest tests
+'''
+
+
+def test_unseen_keeps_order_and_is_per_profile(tmp_path):
+    state = CrawlState(str(tmp_path / 'state.sqlite3'))
+    state.record('https://a.example/2', 'fire', 'hash', True)
+    assert state.unseen(['https://a.example/1', 'https://a.example/2', 'https://a.example/3'], 'fire') == [
+        'https://a.example/1', 'https://a.example/3',
+    ]
+    assert state.unseen(['https://a.example/2'], 'flood') == ['https://a.example/2'] # other keywords: evaluate again
+    assert state.unseen([], 'fire') == []
+    state.close()
+
+
+def test_unseen_past_the_sqlite_variable_limit(tmp_path):
+    state = CrawlState(str(tmp_path / 'state.sqlite3'))
+    links = [f'https://a.example/{i}' for i in range(1200)]
+    for link in links[::2]:
+        state.record(link, 'fire', None, False)
+    assert state.unseen(links, 'fire') == links[1::2]
+    state.close()
+
+
+def test_state_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'state.sqlite3')
+    state = CrawlState(path)
+    state.record('https://a.example/1', 'fire', 'hash', False)
+    state.close()
+    state = CrawlState(path)
+    assert state.unseen(['https://a.example/1'], 'fire') == []
+    state.close()
+
+
+def test_evict_expired_then_oldest(tmp_path):
+    state = CrawlState(str(tmp_path / 'state.sqlite3'), retention_days=1, max_rows=3)
+    for i in range(6):
+        state.record(f'https://a.example/{i}', 'fire', None, False)
+        state.db.execute('UPDATE articles SET checked_at = ? WHERE link = ?', (time.time() - 60 * (10 - i), f'https://a.example/{i}'))
+    state.db.execute('UPDATE articles SET checked_at = ? WHERE link = ?', (time.time() - 2 * 86400, 'https://a.example/5'))
+    state.evict()
+
+    links = [f'https://a.example/{i}' for i in range(6)]
+    # /5 expired, then only the 3 most recently checked of the rest are kept
+    assert state.unseen(links, 'fire') == links[:2] + links[5:]
+    state.close()
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from net.engine import FetchEngine
+
+'''
+    FetchEngine's use of the per-host controllers: half-open trials and the latency the adaptive limit sees
+
+        python -m pytest tests
+'''
+
+
+async def instant(url: str):
+    return url
+
+
+def test_cancelled_trial_does_not_block_the_host():
+    async def run():
+        engine = FetchEngine()
+        engine._bind()
+        host = engine.host('https://a.example/')
+        host.open_until = time.monotonic() - 1 # cooldown over: the next request is the trial
+        host.paused_until = time.monotonic() + 60 # the trial waits in acquire (a Retry-After pause)
+
+        trial = asyncio.create_task(engine.submit(instant, 'https://a.example/1'))
+        await asyncio.sleep(0.01)
+        trial.cancel()
+        await asyncio.gather(trial, return_exceptions=True)
+
+        host.paused_until = 0.0
+        return await asyncio.wait_for(engine.submit(instant, 'https://a.example/2'), 1)
+
+    assert asyncio.run(run()) == 'https://a.example/2'
+
+
+def test_global_wait_is_not_counted_as_host_latency():
+    async def slow(url: str):
+        await asyncio.sleep(0.3)
+        return url
+
+    async def run():
+        engine = FetchEngine(max_in_flight=1)
+        slow_task = asyncio.create_task(engine.submit(slow, 'https://slow.example/'))
+        await asyncio.sleep(0.01) # the slow host holds the only global slot
+        await engine.submit(instant, 'https://fast.example/')
+        await slow_task
+        return engine.host('https://fast.example/')
+
+    fast = asyncio.run(run())
+    assert fast.latency < 0.1
+    assert fast.limit > 4 # grew on a fast success instead of shrinking
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from feeds.webfeeds import WebFeed
+from net.engine import FetchEngine
+from storage.httpcache import HttpCache
+
+'''
+    HttpCache (validators and index page feed lists) and how WebFeed.get_urls uses it
+
+        python -m pytest tests
+'''
+
+INDEX = b'<html><body><a href="/rss/news.xml">News</a><a href="/about">About</a></body></html>'
+CONSENT = b'<html><body><a href="/accept">Accept cookies</a></body></html>'
+
+
+def test_validators_per_namespace(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+    cache.store('https://a.example/rss', {'ETag': '"v1"', 'Last-Modified': 'Mon, 02 Mar 2026 10:00:00 GMT'}, 2048, 'fire')
+    assert cache.request_headers('https://a.example/rss', 'fire') == {
+        'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 02 Mar 2026 10:00:00 GMT',
+    }
+    assert cache.request_headers('https://a.example/rss', 'fire:24h') == {}
+
+    cache.record_not_modified('https://a.example/rss', 'fire')
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'not_modified': 1, 'bytes_saved': 2048}
+
+    cache.store('https://b.example/rss', {}, 100) # nothing to revalidate with
+    assert cache.request_headers('https://b.example/rss') == {}
+    cache.close()
+
+
+def test_feed_list_ttl(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'), feed_list_ttl=60)
+    cache.put_feed_list('https://a.example/feeds', {'https://a.example/rss'})
+    assert cache.get_feed_list('https://a.example/feeds') == {'https://a.example/rss'}
+
+    cache.db.execute('UPDATE feed_lists SET stored_at = ?', (time.time() - 120,))
+    assert cache.get_feed_list('https://a.example/feeds') is None
+    assert cache.get_feed_list('https://a.example/feeds', fresh=False) == {'https://a.example/rss'}
+    cache.close()
+
+
+def test_empty_feed_lists_are_never_served(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+    cache.put_feed_list('https://a.example/feeds', set())
+    assert cache.get_feed_list('https://a.example/feeds', fresh=False) is None
+    # one stored by an older version
+    cache.db.execute('INSERT INTO feed_lists VALUES (?, ?, ?)', ('https://b.example/feeds', '[]', time.time()))
+    assert cache.get_feed_list('https://b.example/feeds') is None
+    cache.close()
+
+
+def get_urls(tmp_path, responses: list) -> tuple[set[str], list[dict], HttpCache]:
+    '''
+        WebFeed.get_urls against canned (status, content, validators) responses. Returns the links,
+        the conditional headers each request sent and the cache
+    '''
+    sent = []
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+    feed = WebFeed('https://a.example', '/feeds', engine=FetchEngine())
+
+    def get_conditional(url: str, headers: dict):
+        sent.append(headers)
+        return responses.pop(0)
+
+    feed.get_conditional = get_conditional
+    try:
+        links = asyncio.run(feed.get_urls(cache))
+    finally:
+        feed.engine.close()
+    return links, sent, cache
+
+
+def test_consent_page_is_not_cached(tmp_path):
+    links, _, cache = get_urls(tmp_path, [(200, CONSENT, {'ETag': '"c"'})])
+    assert links == set()
+    assert cache.get_feed_list('https://a.example/feeds', fresh=False) is None
+    assert cache.request_headers('https://a.example/feeds') == {} # so the next run gets the whole page
+    cache.close()
+
+
+def test_not_modified_without_a_stored_list_refetches(tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+    cache.store('https://a.example/feeds', {'ETag': '"v1"'}, len(INDEX))
+    cache.close()
+
+    links, sent, cache = get_urls(tmp_path, [(304, b'', {}), (200, INDEX, {'ETag': '"v2"'})])
+    assert links == {'/rss/news.xml'}
+    assert sent == [{'If-None-Match': '"v1"'}, {}]
+    assert cache.get_feed_list('https://a.example/feeds') == {'/rss/news.xml'}
+    cache.close()
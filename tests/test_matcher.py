@@ -0,0 +1,70 @@
+import os
+import re
+import sys
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from feeds.matcher import KeywordMatcher, KeywordScanner
+
+'''
+    KeywordMatcher/KeywordScanner against a naive one-regex-per-keyword matcher
+
+        python -m pytest tests
+'''
+
+
+def naive(words: list[str], text: str, whole_word: bool) -> set[str]:
+    text = text.casefold()
+    if whole_word:
+        return {word for word in words if re.search(rf'(?<!\w){re.escape(word.casefold())}(?!\w)', text)}
+    return {word for word in words if word.casefold() in text}
+
+
+def scan(matcher: KeywordMatcher, pieces: list[str]) -> set[str]:
+    scanner = KeywordScanner(matcher)
+    for i, piece in enumerate(pieces):
+        scanner.feed(piece, final=i == len(pieces) - 1)
+    return scanner.found
+
+
+def split(rng: random.Random, text: str) -> list[str]:
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 6))))
+    return [text[i:j] for i, j in zip([0, *cuts], [*cuts, len(text)])]
+
+
+def test_whole_word_skips_longer_words():
+    matcher = KeywordMatcher(['fire'], whole_word=True)
+    assert matcher.findall('the bonfire is out') == set()
+    assert matcher.findall('a fire, then fires') == {'fire'}
+    assert not matcher.search('wildfires')
+
+
+def test_scanner_whole_word_across_pieces():
+    matcher = KeywordMatcher(['fire'], whole_word=True)
+    assert scan(matcher, ['the bonfire ', 'is out']) == set()
+    assert scan(matcher, ['the bon', 'fire is out']) == set()
+    assert scan(matcher, ['a big fi', 're is out']) == {'fire'}
+    assert scan(matcher, ['a big fire', 'wall']) == set()
+
+
+def test_prefix_keywords_and_case():
+    matcher = KeywordMatcher(['Fire', 'firefighter', 'flood'], whole_word=True)
+    assert matcher.findall('FIREFIGHTER at the fire') == {'Fire', 'firefighter'}
+    assert KeywordMatcher(['fire', 'fires']).findall('wildfires') == {'fire', 'fires'}
+
+
+def test_random_text_matches_naive():
+    rng = random.Random(0)
+    words = ['fire', 'fires', 'flood', 'ire', 'evacuation', 'storm', 'or']
+    many = words + [f'filler{i}' for i in range(120)] # past TRIE_MIN_WORDS, so the trie regex is used
+    for whole_word in (False, True):
+        for keywords in (words, many):
+            matcher = KeywordMatcher(keywords, whole_word=whole_word)
+            for _ in range(300):
+                text = ''.join(rng.choice(['fire', 'fires', 'bon', 'flood', 'ire', 'storm', 'or', ' ', ' ', '.', 'x'])
+                               for _ in range(rng.randint(1, 30)))
+                expected = naive(keywords, text, whole_word)
+                assert matcher.findall(text) == expected, text
+                assert matcher.search(text) == bool(expected), text
+                assert scan(matcher, split(rng, text)) == expected, text
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from net.ratelimit import HostController, Throttled, backoff, parse_retry_after
+from settings import BREAKER_FAILURES, RETRY_BACKOFF_MAX, TARGET_LATENCY
+
+'''
+    HostController's adaptive limit and circuit breaker, and the retry helpers
+
+        python -m pytest tests
+'''
+
+
+def controller(start_limit: int = 4) -> HostController:
+    host = HostController('a.example', max_limit=8, start_limit=start_limit)
+    host.bind()
+    return host
+
+
+def throttled(status: int, retry_after: float = None) -> Throttled:
+    response = requests.Response()
+    response.status_code = status
+    return Throttled(f'{status}', response=response, retry_after=retry_after)
+
+
+def finish(host: HostController, seconds: float = 0.1, error: Exception = None):
+    host.active += 1 # as if acquired
+    host.release(seconds, error)
+
+
+def test_fast_successes_grow_the_limit_up_to_max():
+    host = controller()
+    for _ in range(200):
+        finish(host)
+    assert host.limit == 8
+
+
+def test_slow_host_shrinks_the_limit():
+    host = controller()
+    for _ in range(20):
+        finish(host, TARGET_LATENCY * 3)
+    assert host.limit < 4
+    assert host.latency > TARGET_LATENCY
+
+
+def test_throttling_halves_and_pauses():
+    host = controller()
+    finish(host, error=throttled(429, retry_after=5))
+    assert host.limit == 2
+    assert host.paused_until > time.monotonic() + 4
+    finish(host, error=requests.ConnectionError('reset'))
+    assert host.limit == 1.5
+
+
+def test_breaker_opens_after_failures_in_a_row():
+    host = controller()
+    for _ in range(BREAKER_FAILURES - 1):
+        finish(host, error=requests.Timeout('slow'))
+    assert host.allow()
+    finish(host, error=requests.Timeout('slow'))
+    assert host.is_open and not host.allow()
+    assert host.trips == 1
+
+
+def test_half_open_trial():
+    host = controller()
+    for _ in range(BREAKER_FAILURES):
+        finish(host, error=requests.Timeout('slow'))
+    host.open_until = time.monotonic() - 1 # cooldown over
+
+    assert host.allow() # the trial
+    assert not host.allow() # everyone else waits for it
+    finish(host, error=requests.Timeout('still slow'))
+    assert host.is_open and host.trips == 2 # one failed trial reopens it
+
+    host.open_until = time.monotonic() - 1
+    assert host.allow()
+    finish(host)
+    assert not host.is_open and host.open_until == 0.0
+    assert host.allow() and host.allow() # closed again
+
+
+def test_cancelled_trial_lets_the_next_one_through():
+    host = controller()
+    host.open_until = time.monotonic() - 1
+    assert host.allow()
+    host.active += 1
+    host.cancel()
+    assert host.allow()
+
+
+def test_backoff_bounds():
+    for attempt in range(10):
+        assert 0 <= backoff(attempt) <= RETRY_BACKOFF_MAX
+    assert backoff(0, retry_after=7) >= 7
+    assert backoff(0, retry_after=3600) == RETRY_BACKOFF_MAX
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('120') == 120
+    assert parse_retry_after('-5') == 0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0 # in the past
@@ -0,0 +1,94 @@
+import os
+import sys
+import csv
+import json
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from sinks import FIELDS, CsvSink, JsonlSink, flushing, open_sink
+
+'''
+    Result sinks: formats, batching and the flush timer
+
+        python -m pytest tests
+'''
+
+
+def row(i: int) -> dict:
+    return {
+        'Profile': 'fire', 'Title': f'Story {i}', 'Link': f'https://a.example/{i}', 'Outlet': 'a.example',
+        'Published': '2026-03-01T10:00:00Z', 'Keywords': ['fire', 'evacuate'], 'Latency': 0.25, 'Extra': 'dropped',
+    }
+
+
+def read_csv(path: str) -> list[dict]:
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_csv_rows_and_append(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    with open_sink(path) as sink:
+        assert isinstance(sink, CsvSink)
+        sink.write(row(1))
+    with open_sink(path, append=True) as sink:
+        sink.write(row(2))
+
+    rows = read_csv(path)
+    assert [r['Title'] for r in rows] == ['Story 1', 'Story 2'] # one header
+    assert rows[0]['Keywords'] == 'fire; evacuate'
+    assert list(rows[0]) == FIELDS
+
+
+def test_jsonl_keeps_only_the_fields(tmp_path):
+    path = str(tmp_path / 'out.jsonl')
+    with open_sink(path, fields=['Title', 'Keywords']) as sink:
+        assert isinstance(sink, JsonlSink)
+        sink.write(row(1))
+    with open(path, encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == [{'Title': 'Story 1', 'Keywords': ['fire', 'evacuate']}]
+
+
+def test_batches(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    sink = CsvSink(path, batch_rows=3, flush_seconds=3600)
+    sink.write(row(1))
+    sink.write(row(2))
+    assert read_csv(path) == [] # buffered
+    sink.write(row(3))
+    assert len(read_csv(path)) == 3
+    sink.write(row(4))
+    sink.close()
+    assert len(read_csv(path)) == 4 and sink.rows == 4
+
+
+def test_flush_timer_writes_rows_after_a_quiet_spell(tmp_path):
+    path = str(tmp_path / 'out.csv')
+    sink = CsvSink(path, batch_rows=100, flush_seconds=3600)
+
+    async def run():
+        async with flushing([sink], 0.05):
+            sink.write(row(1))
+            await asyncio.sleep(0.2) # no more rows come in
+            return len(read_csv(path))
+
+    assert asyncio.run(run()) == 1
+    sink.close()
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink(str(tmp_path / 'out.xlsx'))
+
+
+def test_parquet(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'out.parquet')
+    with open_sink(path) as sink:
+        sink.write(row(1))
+    assert pq.read_table(path).to_pylist()[0]['Keywords'] == ['fire', 'evacuate']
+    with pytest.raises(ValueError):
+        open_sink(path, append=True)
@@ -0,0 +1,72 @@
+import os
+import sys
+import random
+import string
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from feeds.crawl import Crawl
+from feeds.profiles import Profile
+from storage.textstore import TextStore
+
+'''
+    TextStore (compressed, content addressed article text) and offline re-query against it
+
+        python -m pytest tests
+'''
+
+
+def noise(seed: int, size: int = 20_000) -> str:
+    # random letters barely compress, so sizes are predictable
+    rng = random.Random(seed)
+    return ''.join(rng.choice(string.ascii_letters + ' ') for _ in range(size))
+
+
+def put(store: TextStore, i: int, text: str, published: str = None):
+    store.put(f'https://a.example/{i}', f'https://a.example/{i}?utm_source=rss', f'Title {i}', 'summary', 'a.example', published, text)
+
+
+def test_round_trip_and_dedup(tmp_path):
+    store = TextStore(str(tmp_path / 'texts.sqlite3'))
+    put(store, 1, 'Crews fight the fire near town')
+    put(store, 2, 'Crews fight the fire near town') # same article under another link
+    put(store, 1, 'Crews fight the fire near town') # stored again
+    assert store.stats()['articles'] == 2
+    assert store.db.execute('SELECT COUNT(*) FROM texts').fetchone()[0] == 1
+
+    articles = sorted(store.articles(), key=lambda article: article['url'])
+    assert articles[0] == {
+        'url': 'https://a.example/1?utm_source=rss', 'title': 'Title 1', 'summary': 'summary',
+        'outlet': 'a.example', 'published': None, 'text': 'Crews fight the fire near town',
+    }
+    store.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / 'texts.sqlite3')
+    store = TextStore(path, max_bytes=10**9)
+    for i in range(5):
+        put(store, i, noise(i))
+        store.db.execute('UPDATE articles SET used_at = ? WHERE link = ?', (i, f'https://a.example/{i}'))
+    store.db.execute('UPDATE articles SET used_at = 99 WHERE link = ?', ('https://a.example/0',)) # read recently
+    store.db.commit()
+    one = store.size / 5
+    store.close()
+
+    store = TextStore(path, max_bytes=int(one * 3.5))
+    assert store.size > store.max_bytes # the size is read back from disk
+    store.evict()
+    kept = {article['url'].split('?')[0] for article in store.articles()}
+    assert store.size <= store.max_bytes
+    assert 'https://a.example/0' in kept and 'https://a.example/1' not in kept
+    store.close()
+
+
+def test_requery(tmp_path):
+    store = TextStore(str(tmp_path / 'texts.sqlite3'))
+    put(store, 1, 'Crews were told to evacuate', '2026-03-01T10:00:00Z')
+    put(store, 2, 'Nothing to see here', '2026-03-01T10:00:00Z')
+    put(store, 3, 'Crews were told to evacuate', '2026-01-01T10:00:00Z') # outside the window
+    crawl = Crawl([Profile('fire', ['title'], ['evacuate'])], window='2026-02-01', texts=store)
+    assert [row['Link'] for row in crawl.requery()] == ['https://a.example/1?utm_source=rss']
+    store.close()
@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from net.urls import canonical_url, entry_link, resolve_url
+
+'''
+    URL canonicalization (the run-wide article dedup key) and feed link resolution
+
+        python -m pytest tests
+'''
+
+
+def test_same_article_through_different_feeds():
+    links = [
+        'https://www.example.com/news/fire-update/',
+        'http://example.com/news/fire-update?utm_source=rss&utm_medium=feed',
+        'https://EXAMPLE.com:443/news/fire-update#comments',
+        'https://example.com/news/fire-update?fbclid=abc&ref=homepage',
+    ]
+    assert {canonical_url(link) for link in links} == {'https://example.com/news/fire-update'}
+
+
+def test_query_kept_and_sorted():
+    assert canonical_url('https://example.com/story?page=2&id=7') == 'https://example.com/story?id=7&page=2'
+    assert canonical_url('https://example.com/story?id=7') != canonical_url('https://example.com/story?id=8')
+
+
+def test_port_and_root():
+    assert canonical_url('https://example.com:8080/a/') == 'https://example.com:8080/a'
+    assert canonical_url('https://www.example.com') == 'https://example.com/'
+
+
+def test_other_schemes_untouched():
+    assert canonical_url(' mailto:news@example.com ') == 'mailto:news@example.com'
+
+
+def test_entry_link_falls_back_to_web_guids_only():
+    assert entry_link({'link': 'https://example.com/a', 'id': 'https://example.com/b'}) == 'https://example.com/a'
+    assert entry_link({'id': 'https://example.com/b'}) == 'https://example.com/b'
+    assert entry_link({'guid': 'tag:example.com,2024:123'}) is None
+    assert entry_link({'guid': 'example.com/c', 'guidislink': True}) == 'example.com/c'
+
+
+def test_resolve_url():
+    assert resolve_url('https://example.com/en/news', '/en/story') == 'https://example.com/en/story'
+    assert resolve_url('https://example.com', '//cdn.example.com/story') == 'https://cdn.example.com/story'
+    assert resolve_url('https://example.com', 'https://other.com/story') == 'https://other.com/story'
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from feeds.crawl import Crawl, window_start
+from feeds.parsing import window_entries
+from feeds.profiles import Profile
+
+'''
+    Published-date windows: reading the window, dropping feed entries outside it and when a run counts as successful
+
+        python -m pytest tests
+'''
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def entry(title: str, hours_ago: float = None) -> dict:
+    if hours_ago is None:
+        return {'title': title}
+    return {'title': title, 'published_parsed': time.gmtime((NOW - timedelta(hours=hours_ago)).timestamp())}
+
+
+def test_relative_windows():
+    assert window_start('24h', now=NOW) == NOW - timedelta(hours=24)
+    assert window_start(' 90m ', now=NOW) == NOW - timedelta(minutes=90)
+    assert window_start('1.5D', now=NOW) == NOW - timedelta(hours=36)
+    assert window_start('2w', now=NOW) == NOW - timedelta(weeks=2)
+
+
+def test_dates_and_last_run():
+    assert window_start('2026-02-20T08:00:00+00:00') == datetime(2026, 2, 20, 8, tzinfo=timezone.utc)
+    assert window_start('last-run', last_run=NOW.timestamp()) == NOW
+    assert window_start('last-run') is None # no earlier run: no window
+    assert window_start(None) is None
+    with pytest.raises(ValueError):
+        window_start('yesterday')
+
+
+def test_newest_first_feed_is_cut_at_the_first_old_entry():
+    entries = [entry('a', 1), entry('b', 5), entry('undated'), entry('c', 30), entry('d', 2)]
+    since = (NOW - timedelta(hours=24)).timestamp()
+    # d is newer than c, so the feed isn't newest first and every entry is checked
+    assert [e['title'] for e in window_entries(entries, since)] == ['a', 'b', 'undated', 'd']
+    entries = [entry('a', 1), entry('b', 5), entry('c', 30), entry('undated'), entry('d', 40)]
+    assert [e['title'] for e in window_entries(entries, since)] == ['a', 'b']
+    assert window_entries(entries, None) is entries
+
+
+def test_in_window():
+    crawl = Crawl([Profile('test', ['fire'], [])], window='2026-02-20T00:00:00+00:00')
+    assert crawl.in_window('2026-02-21T00:00:00Z')
+    assert not crawl.in_window('2026-02-19T23:59:59Z')
+    assert crawl.in_window(None)
+    assert crawl.in_window(crawl.since_date.isoformat()) # listing dates only give the day
+
+
+class Runs:
+    def __init__(self):
+        self.recorded = []
+
+    def last_success(self, profile):
+        return None
+
+    def record(self, profile, started):
+        self.recorded.append(profile)
+
+
+@pytest.mark.parametrize('status, recorded', [('finished', 1), ('partial', 0), ('cut off', 0), ('failed', 0)])
+def test_only_fully_finished_runs_are_recorded(status, recorded):
+    crawl = Crawl([Profile('test', ['fire'], [])], runs=Runs())
+    crawl.feed_done('https://a.example/rss', 'finished', 3, 1.0)
+    crawl.feed_done('https://b.example/rss', status, 1, 2.0, gave_up=0 if status == 'finished' else 2)
+    crawl.finish()
+    assert len(crawl.runs.recorded) == recorded